@@ -0,0 +1,302 @@
+"""Time the pipeline stages and the dashboard's data paths on synthetic data.
+
+Generates a synthetic data/historical_data (see benchmarks/synthetic.py)
+in a scratch directory, runs every pipeline stage there one after the
+other, then calls the dashboard's data_access functions the way each tab
+does. No Streamlit server is started: the cached loaders run in bare mode
+and every cache is cleared before each timed call, so "seconds" is the
+cost of a first visit and "warm_seconds" that of a rerun.
+
+The startup group launches a fresh interpreter per run (see
+benchmarks/startup.py) and times how long a new replica takes to import,
+paint the header, send the first chart and finish the default tab. First
+paint is checked against ``--startup-budget`` seconds.
+
+Each case is timed ``--repeat`` times and then run once more under
+tracemalloc for its peak Python/NumPy allocation (Arrow buffers are not
+counted). The JSON report records the data shape and library versions so
+reports are comparable across runs; ``--compare`` prints the change
+against an earlier report.
+
+Usage (from the repository root):
+
+    python benchmarks/run.py
+    python benchmarks/run.py --firms 600 --years 10 --repeat 5 --compare benchmarks/results/before.json
+    python benchmarks/run.py --only startup --startup-budget 1.5
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Make the repository's modules importable when run as a script
+sys.path.insert(0, ROOT)
+sys.path.insert(1, os.path.join(ROOT, "dashboard"))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from tadawul import ingest
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+GENERATED_DIRS = ["output", "outputs"]
+# Seconds from process launch until the header is sent
+STARTUP_BUDGET = 2.0
+
+
+def measure(func, repeat):
+    """Run ``func`` ``repeat`` times; returns (timings, peak MB, last result)."""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return timings, peak / 2**20, result
+
+
+def summary(group, name, timings, peak_mb, **extra):
+    return {
+        "group": group,
+        "case": name,
+        "seconds": round(min(timings), 4),
+        "median_seconds": round(statistics.median(timings), 4),
+        "runs": len(timings),
+        "peak_mb": round(peak_mb, 1),
+        **extra,
+    }
+
+
+# ==== Pipeline stages ====
+def bench_pipeline(repeat):
+    import pipeline
+
+    stages = pipeline.build_pipeline()
+    rows, results = [], {}
+    for name in stages.order:
+        stage = stages.stages[name]
+
+        def run(stage=stage):
+            # Stages like ingest and correlations are incremental; time a cold run
+            if name == "ingest":
+                shutil.rmtree(ingest.STORE_DIR, ignore_errors=True)
+            if name == "correlations":
+                shutil.rmtree(pipeline.correlation.STATE_DIR, ignore_errors=True)
+            result = stage.func(*(results[dep] for dep in stage.deps))
+            if stage.save is not None:
+                stage.save(result)
+            return result
+
+        timings, peak, results[name] = measure(run, repeat)
+        rows.append(summary("pipeline", name, timings, peak))
+        print(f"  {name:<14} {min(timings):8.3f}s  {peak:8.1f} MB")
+    return rows
+
+
+# ==== Dashboard data paths ====
+def dashboard_cases(data_access):
+    """(tab, case, call) for the data each tab prepares, on the generated outputs."""
+    from tadawul.correlation import cluster_order
+
+    trend = data_access.load_trend_data()
+    dates = trend["Date"]
+    start, end = dates.min().date(), dates.max().date()
+    window_start = (dates.max() - pd.Timedelta(days=365)).date()
+    firms = trend["Firm"].cat.categories[:5].tolist()
+    sectors = trend["Sector"].cat.categories[:3].tolist()
+
+    return [
+        ("tab1", "load_trend_data", lambda: data_access.load_trend_data()),
+        ("tab1", "window_performance_full", lambda: data_access.window_performance(start, end)),
+        ("tab1", "window_performance_1y", lambda: data_access.window_performance(window_start, end)),
+        ("tab1", "filter_firm_trend", lambda: data_access.load_trend_index().slice(tuple(firms), start, end)),
+        ("tab1", "filter_firm_trend_monthly", lambda: data_access.load_trend_index(resolution="monthly").slice(
+            tuple(firms), start, end)),
+        ("tab1", "rollup_sector", lambda: data_access.rollup_average("Sector", window_start, end)),
+        ("tab2", "indicators_firms", lambda: data_access.load_indicators(tuple(firms), start, end)),
+        ("tab3", "risk_table", lambda: data_access.load_csv(data_access.RISK_TABLE)),
+        ("tab3", "drawdown_series", lambda: data_access.load_risk_series(firms)),
+        ("tab4", "correlation_sector", lambda: data_access.load_correlation("sector")),
+        ("tab4", "correlation_firm_60d", lambda: data_access.load_correlation("firm", 60)),
+        ("tab4", "cluster_firm", lambda: cluster_order(data_access.load_correlation("firm").to_numpy())),
+        ("tab5", "filter_sort_rows", lambda: data_access.table_rows(
+            data_access.PRICE_TREND_DATA, sectors=tuple(sectors), sort_by="Close", descending=True)),
+        ("tab5", "export_csv", lambda: data_access.export_rows(
+            data_access.PRICE_TREND_DATA, data_access.table_rows(
+                data_access.PRICE_TREND_DATA, sectors=tuple(sectors)), list(trend.columns))),
+    ]
+
+
+def bench_dashboard(repeat):
+    import streamlit as st
+    import streamlit.logger
+
+    # Bare-mode Streamlit warns on every cached function without a running server
+    streamlit.logger.set_log_level("error")
+    import data_access
+
+    def clear():
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+    rows = []
+    for tab, name, call in dashboard_cases(data_access):
+        def cold(call=call):
+            clear()
+            return call()
+
+        timings, peak, _ = measure(cold, repeat)
+        warm = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            call()
+            warm.append(time.perf_counter() - started)
+        rows.append(summary(tab, name, timings, peak, warm_seconds=round(min(warm), 5)))
+        print(f"  {tab}/{name:<26} {min(timings):8.3f}s  warm {min(warm):8.5f}s  {peak:8.1f} MB")
+    clear()
+    return rows
+
+
+# ==== Cold start ====
+def bench_startup(repeat, budget=STARTUP_BUDGET):
+    shutil.copytree(os.path.join(ROOT, "assets"), "assets", dirs_exist_ok=True)
+    runs = []
+    for _ in range(repeat):
+        launched = repr(time.time())
+        done = subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "startup.py"), launched],
+                              capture_output=True, text=True, check=True)
+        run = json.loads(done.stdout.strip().splitlines()[-1])
+        if run["exceptions"]:
+            raise RuntimeError(f"Dashboard raised on startup: {run['exceptions']}")
+        runs.append(run)
+
+    rows = []
+    peak = max(run["max_rss_mb"] for run in runs)
+    for name in runs[0]["timings"]:
+        timings = [run["timings"][name] for run in runs if name in run["timings"]]
+        extra = {}
+        if name == "first_paint":
+            extra = {"budget_seconds": budget, "within_budget": min(timings) <= budget}
+        rows.append(summary("startup", name, timings, peak, **extra))
+        flag = "" if not extra else ("  ✅ within budget" if extra["within_budget"] else f"  ❌ over {budget}s budget")
+        print(f"  {name:<14} {min(timings):8.3f}s  {peak:8.1f} MB rss{flag}")
+    return rows
+
+
+# ==== Report ====
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, previous):
+    before = {(row["group"], row["case"]): row for row in previous["results"]}
+    print(f"\nCompared with {previous['meta'].get('commit')} ({previous['meta'].get('started')}):")
+    shape = ("firms", "years", "seed")
+    if any(report["meta"][key] != previous["meta"].get(key) for key in shape):
+        print("  ⚠️ The reports were made on different synthetic data ("
+              + ", ".join(f"{key} {previous['meta'].get(key)} -> {report['meta'][key]}" for key in shape) + ")")
+    for row in report["results"]:
+        old = before.get((row["group"], row["case"]))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = row["seconds"] / old["seconds"]
+        flag = "❌" if ratio > 1.2 else "✅"
+        print(f"  {flag} {row['group']}/{row['case']:<26} {old['seconds']:8.3f}s -> {row['seconds']:8.3f}s"
+              f"  ({ratio:5.2f}x)  {old['peak_mb']:7.1f} -> {row['peak_mb']:7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline and dashboard data paths.")
+    parser.add_argument("--firms", type=int, default=270)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", choices=["pipeline", "dashboard", "startup"], help="skip the other groups")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET,
+                        help="seconds allowed until first paint (default: %(default)s)")
+    parser.add_argument("--out", help="report path (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", metavar="REPORT", help="earlier report to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args()
+
+    started = time.strftime("%Y-%m-%dT%H:%M:%S")
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("%Y%m%dT%H%M%S") + ".json")
+    out = os.path.abspath(out)
+    scratch = tempfile.mkdtemp(prefix="tadawul-bench-")
+    cwd = os.getcwd()
+    try:
+        # The scripts and dashboard use paths relative to the repository root
+        os.chdir(scratch)
+        for name in GENERATED_DIRS:
+            os.makedirs(name)
+        rows = synthetic.generate(ingest.SOURCE_DIR, args.firms, args.years, args.seed)
+        print(f"✅ Synthetic data: {args.firms} firms, {rows} rows in {scratch}")
+
+        results = []
+        print("Pipeline stages:")
+        # The other groups read the pipeline's outputs
+        results += bench_pipeline(args.repeat if args.only in (None, "pipeline") else 1)
+        if args.only in (None, "dashboard"):
+            print("Dashboard data paths:")
+            results += bench_dashboard(args.repeat)
+        if args.only in (None, "startup"):
+            print("Cold start:")
+            results += bench_startup(args.repeat, args.startup_budget)
+        if args.only not in (None, "pipeline"):
+            results = [row for row in results if row["group"] != "pipeline"]
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "started": started,
+            "commit": git_commit(),
+            "firms": args.firms,
+            "years": args.years,
+            "seed": args.seed,
+            "rows": rows,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Report saved to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
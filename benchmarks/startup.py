@@ -0,0 +1,62 @@
+"""Cold start of the dashboard in a fresh interpreter, as a new replica sees it.
+
+Run by ``benchmarks/run.py`` in a directory holding the pipeline outputs
+and assets; prints one JSON object with seconds since the process was
+launched (``launched`` is the parent's ``time.time()``):
+
+- ``import``: Streamlit and its test runner are imported
+- ``first_paint``: the first element (the page CSS/header) is sent
+- ``first_chart``: the first Plotly chart is sent
+- ``first_run``: the first script run has finished, i.e. the default tab
+  is complete
+
+Usage (from a directory with output/, outputs/ and assets/):
+
+    python /path/to/benchmarks/startup.py "$(date +%s.%N)"
+"""
+import json
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, "dashboard", "dashboard.py")
+
+
+def main():
+    launched = float(sys.argv[1]) if len(sys.argv) > 1 else time.time()
+    timings = {}
+
+    def mark(name):
+        timings.setdefault(name, round(time.time() - launched, 4))
+
+    import streamlit.logger
+    from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+    from streamlit.testing.v1 import AppTest
+
+    streamlit.logger.set_log_level("error")
+    mark("import")
+
+    enqueue = ScriptRunContext.enqueue
+
+    def timed_enqueue(ctx, msg):
+        if msg.HasField("delta"):
+            mark("first_paint")
+            if msg.delta.new_element.HasField("plotly_chart"):
+                mark("first_chart")
+        enqueue(ctx, msg)
+
+    ScriptRunContext.enqueue = timed_enqueue
+    app = AppTest.from_file(DASHBOARD, default_timeout=600)
+    app.run()
+    mark("first_run")
+    print(json.dumps({
+        "timings": timings,
+        "exceptions": [e.value for e in app.exception],
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Synthetic scraped price files shaped like data/historical_data.
+
+One ``<Sector>_<Firm>.csv`` per firm, in the scraper's raw layout: headers
+"0".."9", newest date first, prices with thousands separators, volumes
+quoted as "1,234,567", "-" for missing values and two empty trailing
+columns. Sector prefixes are the real ones (including the
+"Pharma,_Biotech_&_Life_Science" comma), firm names carry the usual
+quirks ("Co..", "Al-", "&", apostrophes), a share of firms list part-way
+through the period and a few have no trades at all.
+
+    python -m benchmarks.synthetic --firms 270 --years 5 --out /tmp/historical_data
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from tadawul.sectors import SECTORS
+
+START_DATE = "2020-01-01"
+NAME_WORDS = ["Al-Rajhi", "Saudi", "Arabian", "National", "Gulf", "Al Jouf", "Najran", "United",
+              "Yanbu", "Tabuk", "Jazan", "Eastern", "Al-Babtain", "Makkah", "Red Sea", "Int'l"]
+NAME_SUFFIXES = ["Co.", "Co.", "Group", "Holding Co.", "Industrial Co.", "& Trading Co.", "Bank", "Fund"]
+
+
+def firm_names(n, rng):
+    """``n`` distinct firm names with the separators seen in real file names."""
+    names = []
+    seen = set()
+    while len(names) < n:
+        words = rng.choice(NAME_WORDS, size=rng.integers(1, 3), replace=False)
+        name = " ".join(words) + " " + rng.choice(NAME_SUFFIXES)
+        if name in seen:
+            name = f"{name} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def trading_days(start, years):
+    days = pd.date_range(start, periods=int(round(years * 365.25)), freq="D")
+    # Sunday-Thursday trading week
+    return days[~days.dayofweek.isin([4, 5])]
+
+
+def _prices(rng, n):
+    close = rng.uniform(8, 250) * np.exp(np.cumsum(rng.normal(0, 0.018, n)))
+    previous = np.concatenate([[close[0]], close[:-1]])
+    open_ = previous * (1 + rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, n)))
+    change = close - previous
+    volume = rng.lognormal(13, 1.2, n).astype(np.int64)
+    return open_, high, low, close, change, change / previous * 100, volume
+
+
+def _text(values, fmt, gaps):
+    text = pd.Series(values).map(fmt.format)
+    text[gaps] = "-"
+    return text
+
+
+def firm_frame(days, rng, gap_rate=0.01):
+    """One firm's raw table, newest first, as the scraper saves it."""
+    n = len(days)
+    open_, high, low, close, change, pct, volume = _prices(rng, n)
+    price_gaps = rng.random(n) < gap_rate / 4
+    volume_gaps = price_gaps | (rng.random(n) < gap_rate)
+    df = pd.DataFrame({
+        "0": days.strftime("%Y-%m-%d"),
+        "1": _text(open_, "{:,.2f}", price_gaps),
+        "2": _text(high, "{:,.2f}", price_gaps),
+        "3": _text(low, "{:,.2f}", price_gaps),
+        "4": _text(close, "{:,.2f}", price_gaps),
+        "5": _text(change, "{:,.2f}", price_gaps),
+        "6": _text(pct, "{:,.2f}", price_gaps),
+        "7": _text(volume, "{:,}", volume_gaps),
+        "8": "",
+        "9": "",
+    })
+    return df.iloc[::-1]
+
+
+def generate(out_dir, firms=270, years=5, seed=0, start=START_DATE, gap_rate=0.01,
+             late_listing_rate=0.1, empty_rate=0.01):
+    """Write ``firms`` synthetic files to ``out_dir``; returns the total row count."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    days = trading_days(start, years)
+    prefixes = list(SECTORS)
+    rows = 0
+    for i, name in enumerate(firm_names(firms, rng)):
+        stem = f"{prefixes[i % len(prefixes)]}_{name.replace(' ', '_')}"
+        path = os.path.join(out_dir, stem + ".csv")
+        if rng.random() < empty_rate:
+            # The scraper saves firms without trades as one "No data" cell
+            pd.DataFrame({"0": ["No data available in table"]}).to_csv(path, index=False)
+            continue
+        listed = days
+        if rng.random() < late_listing_rate:
+            listed = days[rng.integers(0, len(days) - 20):]
+        df = firm_frame(listed, rng, gap_rate)
+        df.to_csv(path, index=False)
+        rows += len(df)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic scraped price files.")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--firms", type=int, default=270)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rows = generate(args.out, args.firms, args.years, args.seed)
+    print(f"✅ {args.firms} firms, {rows} rows written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
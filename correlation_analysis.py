@@ -1,27 +1,42 @@
 import pandas as pd
 import os
 
-# Correct file paths
-BASE_DIR = r'C:\Users\user\saudi-stock-market-dashboard-main\outputs'
+from tadawul import correlation
+
+# File paths (relative to the repository root, like the other scripts)
+BASE_DIR = 'outputs'
 INPUT_CSV = os.path.join(BASE_DIR, 'final_cleaned_data.csv')
 SECTOR_OUTPUT = os.path.join(BASE_DIR, 'correlation_by_sector.csv')
 SUPER_SECTOR_OUTPUT = os.path.join(BASE_DIR, 'correlation_by_super_sector.csv')
 
-def main():
-    df = pd.read_csv(INPUT_CSV, parse_dates=['Date'])
-    df = df.dropna(subset=['% Change'])
 
-    # Pivot to get daily % Change per sector
-    sector_pivot = df.groupby(['Date', 'Sector'])['% Change'].mean().unstack()
-    sector_corr = sector_pivot.corr()
-    sector_corr.to_csv(SECTOR_OUTPUT)
+def compute_correlations(df, full=False):
+    """Update the saved sector, super sector and firm correlation states.
+
+    Only trading days newer than the saved states are processed (see
+    tadawul/correlation.py); rolling 60/120-day states are kept as well.
+    """
+    return correlation.update_states(df, full=full)
+
 
-    # Pivot to get daily % Change per Super Sector
-    super_sector_pivot = df.groupby(['Date', 'Super Sector'])['% Change'].mean().unstack()
-    super_sector_corr = super_sector_pivot.corr()
-    super_sector_corr.to_csv(SUPER_SECTOR_OUTPUT)
+def save_correlations(states):
+    correlation.save_states(states)
+
+    # Full-history matrices as CSV for the dashboard, in sorted label order
+    for level, path in [('sector', SECTOR_OUTPUT), ('super_sector', SUPER_SECTOR_OUTPUT)]:
+        corr = states[(level, None)].corr()
+        labels = sorted(corr.index)
+        corr = corr.loc[labels, labels]
+        corr.index.name = correlation.LEVELS[level]
+        corr.to_csv(path)
+
+
+def main():
+    df = pd.read_csv(INPUT_CSV, parse_dates=['Date'])
+    save_correlations(compute_correlations(df))
 
-    print(f"✅ Correlation matrices saved to:\n- Sector: {SECTOR_OUTPUT}\n- Super Sector: {SUPER_SECTOR_OUTPUT}")
+    print(f"✅ Correlation matrices saved to:\n- Sector: {SECTOR_OUTPUT}\n- Super Sector: {SUPER_SECTOR_OUTPUT}"
+          f"\n- States (incl. firm level and rolling windows): {correlation.STATE_DIR}")
 
 if __name__ == '__main__':
     main()
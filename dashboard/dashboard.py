@@ -1,29 +1,47 @@
-import streamlit as st
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.io as pio
+import os
+import sys
+
 import base64
 from datetime import datetime
+from functools import partial, wraps
+
+import streamlit as st
+
+# Make the shared tadawul package importable under `streamlit run`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation
+
+# Long histories are drawn from weekly/monthly closes or thinned to a fixed number of points per line
+DOWNSAMPLE_NOTE = ("ℹ️ Long date ranges are drawn from weekly or monthly closes (or thinned to each period's "
+                   "highs and lows); narrow the date range to see every trading day.")
 
 # --- Page Config ---
 st.set_page_config(page_title="Saudi Arabia Stock Dashboard", layout="wide")
-pio.templates.default = "plotly_white"
+# ✅ Per-rerun timings in the sidebar when run with TADAWUL_DEBUG=1
+instrumentation.start()
 
-# --- Helper: Image to Base64 ---
-def img_to_base64(filename):
-    with open(filename, "rb") as f:
+# --- Load Assets ---
+# Assets ship with the app and do not change while it runs: read once per process
+@instrumentation.cache_resource(show_spinner=False)
+def img_to_base64(path):
+    with open(path, "rb") as f:
         return base64.b64encode(f.read()).decode()
 
-# --- Load Assets ---
-logo1 = img_to_base64("assets/my_logo.png")
-logo2 = img_to_base64("assets/tadawul_logo.png")
+
+@instrumentation.cache_resource(show_spinner=False)
+def read_text(path):
+    with open(path) as f:
+        return f.read()
+
+
+with instrumentation.span("load assets"):
+    logo1 = img_to_base64("assets/my_logo.png")
+    logo2 = img_to_base64("assets/tadawul_logo.png")
 
 # --- Load Custom CSS ---
 def load_css(file_path):
-    with open(file_path) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    st.markdown(f"<style>{read_text(file_path)}</style>", unsafe_allow_html=True)
 load_css("assets/style.css")
 
 # --- Header ---
@@ -41,30 +59,75 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# --- Tabs ---
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "📊 Summary",
-    "📈 Performance Charts",
-    "📉 Volatility & Drawdowns",
-    "🔗 Correlation",
-    "🧾 Raw Data"
-])
+# ✅ pandas, pyarrow and Plotly load after the header is on screen
+with instrumentation.span("import data_access"):
+    import data_access
+# Every loader in this run reads the same published snapshot, even if a new one lands mid-run
+data_access.pin_snapshot()
+
+
+# --- Data refresh ---
+def refresh_status():
+    """Published data version and the refresh scheduler's last run (see scheduler.py)."""
+    state = data_access.load_refresh_state()
+    with st.sidebar.expander("🔄 Data refresh", expanded=False):
+        st.markdown(f"**Data version:** `{data_access.published_version() or 'unpublished'}`")
+        if state is None:
+            st.caption("No scheduled refresh has run; start one with `python scheduler.py`.")
+            return
+        st.markdown(f"**Scheduler:** {state.get('status', 'unknown')} · updated {state.get('updated', '-')}")
+        if state.get("next_run"):
+            st.markdown(f"**Next refresh:** {state['next_run']}")
+        last = state.get("last_run")
+        if not last:
+            return
+        if last["status"] == "failed":
+            st.error(f"❌ Last refresh failed at {last['finished']}: {last['error']}")
+        else:
+            if last["status"] == "partial":
+                st.warning(f"⚠️ {last['error']}; they are retried by the next refresh.")
+            st.markdown(f"**Last refresh:** {last['finished']} · {last['seconds']:,.1f} s"
+                        + ("" if last["published"] else " · no new data"))
+            st.dataframe(
+                [{"Step": name, "Seconds": seconds} for name, seconds in last["steps"].items()]
+                + [{"Step": f"│ {row['stage']} ({row['status']})", "Seconds": row["seconds"]}
+                   for row in last["stages"]],
+                use_container_width=True, hide_index=True,
+            )
+
+
+refresh_status()
+
+
+# --- Charts ---
+def plotting():
+    """figures.py, imported on first use: Plotly Express is not needed to paint the header."""
+    with instrumentation.span("import figures"):
+        import figures
+    return figures
+
+
+def tab_fragment(func):
+    """A tab rendered as a fragment; its fragment-only reruns pin the snapshot too."""
+    @wraps(func)
+    def render():
+        with data_access.pinned_snapshot():
+            return func()
+
+    return instrumentation.fragment(render)
+
 
 # =======================
 # 📊 Tab 1: Summary
 # =======================
-with tab1:
+@tab_fragment
+def summary_tab():
+    figures = plotting()
     st.subheader("📊 Market Performance by Super Sector, Sector, and Firm")
 
-    # ✅ Load all necessary CSVs
-    company_data = pd.read_csv("output/company_price_changes.csv")
-    sector_data = pd.read_csv("output/sector_price_summary.csv")
-    top_movers = pd.read_csv("output/top_movers.csv")
-    bottom_movers = pd.read_csv("output/bottom_movers.csv")
-
-    # ✅ Only read once and convert Date column to datetime
-    trend_data = pd.read_csv("output/price_trend_data.csv")
-    trend_data["Date"] = pd.to_datetime(trend_data["Date"])
+    # ✅ Shared across tabs and sessions, Date already parsed
+    with instrumentation.span("load trend data"):
+        trend_data = data_access.load_trend_data()
 
     # ✅ Check that 'Super Sector' exists
     if "Super Sector" not in trend_data.columns:
@@ -72,7 +135,8 @@ with tab1:
     else:
         all_supers = sorted(trend_data["Super Sector"].dropna().unique())
         super_options = ["All Super Sectors"] + all_supers
-        selected_super = st.selectbox("🧱 Select Super Sector (for Firm Filters)", super_options)
+        selected_super = st.selectbox("🧱 Select Super Sector (for Firm Filters)", super_options,
+                                      key="summary_super", persist_state="session")
 
         if selected_super != "All Super Sectors":
             sectors = trend_data[trend_data["Super Sector"] == selected_super]["Sector"].dropna().unique()
@@ -80,282 +144,273 @@ with tab1:
             sectors = trend_data["Sector"].dropna().unique()
 
         default_sectors = [s for s in ["Materials", "Energy"] if s in sectors]
-        selected_sectors = st.multiselect("🏷️ Select Sector(s)", sorted(sectors), default=default_sectors)
+        selected_sectors = st.multiselect("🏷️ Select Sector(s)", sorted(sectors), default=default_sectors,
+                                          key=f"summary_sectors_{selected_super}", persist_state="session")
 
         firms = trend_data[trend_data["Sector"].isin(selected_sectors)]["Firm"].dropna().unique()
         default_firms = [f for f in ["Saudi Aramco Base Oil Co.", "Saudi Arabian Oil Co.", "Arabian Drilling Co."] if f in firms]
-        selected_firms = st.multiselect("🏢 Select Firm(s)", sorted(firms), default=default_firms)
+        selected_firms = st.multiselect("🏢 Select Firm(s)", sorted(firms), default=default_firms,
+                                        key="summary_firms", persist_state="session")
 
     # ✅ Safe because Date column is datetime now
     min_date = trend_data["Date"].min().date()
     max_date = trend_data["Date"].max().date()
     date_range = st.slider("📅 Select Date Range", min_value=min_date, max_value=max_date,
-                           value=(min_date, max_date), format="YYYY-MM-DD")
+                           value=(min_date, max_date), format="YYYY-MM-DD",
+                           key="summary_dates", persist_state="session")
 
 
-    trend_filtered = trend_data[
-        (trend_data["Sector"].isin(selected_sectors)) &
-        (trend_data["Firm"].isin(selected_firms)) &
-        (trend_data["Date"].dt.date >= date_range[0]) &
-        (trend_data["Date"].dt.date <= date_range[1])
-    ]
+    view_mode = st.radio("🧭 View Mode", ["Grouped by Sector", "Top & Bottom Movers"], horizontal=True,
+                         key="summary_view", persist_state="session")
 
-    view_mode = st.radio("🧭 View Mode", ["Grouped by Sector", "Top & Bottom Movers"], horizontal=True)
+    # ✅ % change, sector stats and movers for the selected dates (recomputed per window)
+    with instrumentation.span("window performance"):
+        performance = data_access.window_performance(date_range[0], date_range[1])
 
     st.markdown("### 📈 % Change Overview")
-    if view_mode == "Grouped by Sector":
-        filtered_company_data = company_data[company_data["Firm"].isin(selected_firms)]
-        fig = px.bar(filtered_company_data, x="Firm", y="Pct_Change", color="Sector")
-        fig.update_layout(
-            title="% Change per Firm",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color="black"),
-            xaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            yaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            legend=dict(
-                orientation="h",
-                yanchor="top",
-                y=-0.3,
-                xanchor="center",
-                x=0.5,
-                title=None,
-                font=dict(size=10)
-            )
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        st.markdown("#### 📋 Sector Summary Stats")
-        st.dataframe(sector_data, use_container_width=True)
-    else:
-        st.markdown("#### 🔝 Top 5 Movers")
-        st.dataframe(top_movers, use_container_width=True)
-        fig_top = px.bar(top_movers, x="Firm", y="Pct_Change", color="Sector")
-        fig_top.update_layout(
-            title="Top 5 Gainers",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color="black"),
-            xaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            yaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            legend=dict(
-                orientation="h",
-                yanchor="top",
-                y=-0.3,
-                xanchor="center",
-                x=0.5,
-                title=None,
-                font=dict(size=10)
-            )
-        )
-        st.plotly_chart(fig_top, use_container_width=True)
-
-        st.markdown("#### 🔻 Bottom 5 Movers")
-        st.dataframe(bottom_movers, use_container_width=True)
-        fig_bottom = px.bar(bottom_movers, x="Firm", y="Pct_Change", color="Sector")
-        fig_bottom.update_layout(
-            title="Bottom 5 Losers",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color="black"),
-            xaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            yaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            legend=dict(
-                orientation="h",
-                yanchor="top",
-                y=-0.3,
-                xanchor="center",
-                x=0.5,
-                title=None,
-                font=dict(size=10)
-            )
-        )
-        st.plotly_chart(fig_bottom, use_container_width=True)
+    with instrumentation.span("% change bars"):
+        if view_mode == "Grouped by Sector":
+            figures.show(figures.pct_change_bar("changes", date_range[0], date_range[1], "% Change per Firm",
+                                                selected_firms))
+            st.markdown("#### 📋 Sector Summary Stats")
+            st.dataframe(performance["sector_summary"], use_container_width=True)
+        else:
+            st.markdown("#### 🔝 Top 5 Movers")
+            st.dataframe(performance["top"], use_container_width=True)
+            figures.show(figures.pct_change_bar("top", date_range[0], date_range[1], "Top 5 Gainers"))
+
+            st.markdown("#### 🔻 Bottom 5 Movers")
+            st.dataframe(performance["bottom"], use_container_width=True)
+            figures.show(figures.pct_change_bar("bottom", date_range[0], date_range[1], "Bottom 5 Losers"))
 
     st.markdown("### 📉 Price Trend Over Time (Firm-Level)")
-    fig_trend = px.line(trend_filtered, x="Date", y="Close", color="Firm")
-    fig_trend.update_layout(
-        title="Price Trend for Selected Firms",
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color="black"),
-        xaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-        yaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-        legend=dict(
-            orientation="h",
-            yanchor="top",
-            y=-0.3,
-            xanchor="center",
-            x=0.5,
-            title=None,
-            font=dict(size=10)
-        )
-    )
-    st.plotly_chart(fig_trend, use_container_width=True)
+    # ✅ Selected firms already belong to the selected sectors
+    with instrumentation.span("firm trend"):
+        fig_trend, thinned = figures.firm_trend(selected_firms, date_range[0], date_range[1],
+                                                "Price Trend for Selected Firms")
+        figures.show(fig_trend)
+    if thinned:
+        st.caption(DOWNSAMPLE_NOTE)
 
     st.markdown("### 🧱📅 Price Trend by Super Sector or Sector")
-    trend_level = st.radio("Select Aggregation Level", ["Super Sector", "Sector"], horizontal=True)
-
-    if trend_level == "Super Sector":
-        trend_filtered_super = trend_data[(trend_data["Date"].dt.date >= date_range[0]) &
-                                          (trend_data["Date"].dt.date <= date_range[1])]
-        super_avg = trend_filtered_super.groupby(["Date", "Super Sector"], as_index=False)["Close"].mean()
-        fig_super = px.line(super_avg, x="Date", y="Close", color="Super Sector")
-        fig_super.update_layout(
-            title="Average Price Trend by Super Sector",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color="black"),
-            xaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            yaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            legend=dict(
-                orientation="h",
-                yanchor="top",
-                y=-0.3,
-                xanchor="center",
-                x=0.5,
-                title=None,
-                font=dict(size=10)
-            )
-        )
-        st.plotly_chart(fig_super, use_container_width=True)
-    else:
-        trend_filtered_sec = trend_data[(trend_data["Date"].dt.date >= date_range[0]) &
-                                        (trend_data["Date"].dt.date <= date_range[1])]
-        sector_avg = trend_filtered_sec.groupby(["Date", "Sector"], as_index=False)["Close"].mean()
-        fig_sec = px.line(sector_avg, x="Date", y="Close", color="Sector")
-        fig_sec.update_layout(
-            title="Average Price Trend by Sector",
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color="black"),
-            xaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            yaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            legend=dict(
-                orientation="h",
-                yanchor="top",
-                y=-0.3,
-                xanchor="center",
-                x=0.5,
-                title=None,
-                font=dict(size=10)
-            )
-        )
-        st.plotly_chart(fig_sec, use_container_width=True)
+    trend_level = st.radio("Select Aggregation Level", ["Super Sector", "Sector"], horizontal=True,
+                           key="summary_level", persist_state="session")
+
+    with instrumentation.span(f"{trend_level} trend"):
+        fig_level, thinned = figures.group_trend(trend_level, date_range[0], date_range[1],
+                                                 f"Average Price Trend by {trend_level}")
+        figures.show(fig_level)
+    if thinned:
+        st.caption(DOWNSAMPLE_NOTE)
 
 # =======================
 # 📈 Tab 2: Performance Charts
 # =======================
-with tab2:
+def compared_firms():
+    """Firms picked in Tab 2, which Tab 3 shows as well."""
+    if "compare_firms" in st.session_state:
+        return st.session_state["compare_firms"]
+    return list(data_access.load_trend_data()["Firm"].dropna().unique()[:5])
+
+
+@tab_fragment
+def performance_tab():
+    figures = plotting()
     st.subheader("📈 Detailed Performance Charts")
-    performance_data = pd.read_csv("output/price_trend_data.csv")
-    performance_data["Date"] = pd.to_datetime(performance_data["Date"])
+    with instrumentation.span("load trend data"):
+        performance_data = data_access.load_trend_data()
     firms = performance_data["Firm"].dropna().unique()
-    selected_firms_perf = st.multiselect("🏢 Select Firm(s) to Compare", sorted(firms), default=list(firms[:5]))
-
-    fig_perf = px.line(performance_data[performance_data["Firm"].isin(selected_firms_perf)],
-                       x="Date", y="Close", color="Firm")
-    fig_perf.update_layout(
-        title="Stock Price Comparison",
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color="black"),
-        xaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-        yaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-        legend=dict(
-            orientation="h",
-            yanchor="top",
-            y=-0.3,
-            xanchor="center",
-            x=0.5,
-            title=None,
-            font=dict(size=10)
-        )
-    )
-    st.plotly_chart(fig_perf, use_container_width=True)
+    selected_firms_perf = st.multiselect("🏢 Select Firm(s) to Compare", sorted(firms), default=list(firms[:5]),
+                                         key="compare_firms", persist_state="session")
+
+    perf_min = performance_data["Date"].min().date()
+    perf_max = performance_data["Date"].max().date()
+    zoom_range = st.slider("🔍 Zoom to Dates", min_value=perf_min, max_value=perf_max,
+                           value=(perf_min, perf_max), format="YYYY-MM-DD",
+                           key="compare_dates", persist_state="session")
+    selected_indicators = st.multiselect("📐 Technical Indicators", figures.INDICATORS,
+                                         key="compare_indicators", persist_state="session")
+
+    with instrumentation.span("firm trend"):
+        fig_perf, thinned = figures.firm_trend(selected_firms_perf, zoom_range[0], zoom_range[1],
+                                               "Stock Price Comparison", selected_indicators)
+        figures.show(fig_perf)
+    if selected_indicators:
+        st.caption(figures.indicator_note(selected_indicators))
+    if thinned:
+        st.caption(DOWNSAMPLE_NOTE)
 
 # =======================
 # 📉 Tab 3: Volatility & Drawdowns
 # =======================
-with tab3:
+@tab_fragment
+def risk_tab():
+    figures = plotting()
     st.subheader("📉 Volatility & Drawdown Analysis")
-    volatility_data = performance_data.copy()
-    volatility_data.set_index("Date", inplace=True)
-
-    for firm in selected_firms_perf:
-        firm_data = volatility_data[volatility_data["Firm"] == firm]["Close"]
-        returns = firm_data.pct_change().dropna()
-        drawdown = (firm_data / firm_data.cummax()) - 1
-        fig_dd = px.area(drawdown, title=f"{firm} Drawdown", labels={"value": "Drawdown"})
-        fig_dd.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color="black"),
-            xaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            yaxis=dict(title_font=dict(color='black'), tickfont=dict(color='black')),
-            legend=dict(
-                orientation="h",
-                yanchor="top",
-                y=-0.3,
-                xanchor="center",
-                x=0.5,
-                title=None,
-                font=dict(size=10)
-            )
-        )
-        st.markdown(f"### 📉 {firm} Volatility & Drawdown")
-        st.line_chart(returns, height=150, use_container_width=True)
-        st.plotly_chart(fig_dd, use_container_width=True)
+    selected_firms_perf = compared_firms()
+    with instrumentation.span("risk table"):
+        risk_table = data_access.load_csv(data_access.RISK_TABLE)
+        st.dataframe(risk_table[risk_table["Firm"].isin(selected_firms_perf)], use_container_width=True)
+
+    # ✅ Precomputed by the pipeline; only the selected firms are read
+    with instrumentation.span("load risk series"):
+        risk_data = data_access.load_risk_series(selected_firms_perf)
+    combined = st.toggle("📊 Show all selected firms in one chart", value=False,
+                         key="risk_combined", persist_state="session")
+
+    with instrumentation.span("build drawdown panels"):
+        if combined:
+            panels = [(
+                "Selected Firms",
+                risk_data.pivot(index="Date", columns="Firm", values="Daily_Return"),
+                figures.drawdown_lines(selected_firms_perf),
+            )]
+        else:
+            panels = []
+            for firm, firm_risk in risk_data.groupby("Firm", sort=False):
+                panels.append((
+                    firm,
+                    firm_risk.set_index("Date")["Daily_Return"].dropna(),
+                    figures.drawdown_area(firm),
+                ))
+
+    with instrumentation.span("show drawdown panels"):
+        for name, returns, fig_dd in panels:
+            st.markdown(f"### 📉 {name} Volatility & Drawdown")
+            st.line_chart(returns, height=150, use_container_width=True)
+            figures.show(fig_dd)
 
 # =======================
 # 🔗 Tab 4: Correlation
 # =======================
-with tab4:
+@tab_fragment
+def correlation_tab():
+    figures = plotting()
     st.subheader("🔗 Correlation Analysis")
-    corr_sector = pd.read_csv("outputs/correlation_by_sector.csv", index_col=0)
-    corr_super = pd.read_csv("outputs/correlation_by_super_sector.csv", index_col=0)
 
-    corr_type = st.radio("Select Correlation Type", ["Sector", "Super Sector"], horizontal=True)
-
-    if corr_type == "Sector":
-        st.markdown("### 🔗 Sector-Level Correlation Matrix")
-        data_to_plot = corr_sector
-        title = "Sector Return Correlation Matrix"
-    else:
-        st.markdown("### 🔗 Super Sector-Level Correlation Matrix")
-        data_to_plot = corr_super
-        title = "Super Sector Return Correlation Matrix"
-
-    fig, ax = plt.subplots(figsize=(14, 10))
-    sns.set(style="whitegrid")
-    heatmap = sns.heatmap(
-        data_to_plot,
-        annot=True,
-        fmt=".2f",
-        cmap="Blues",
-        center=0,
-        linewidths=0.7,
-        linecolor="#E0E0E0",
-        cbar_kws={"shrink": 0.75}
-    )
-    ax.set_title(title, fontsize=18, weight="bold", pad=15, color='black')
-    ax.tick_params(axis='x', colors='black')
-    ax.tick_params(axis='y', colors='black')
-    st.pyplot(fig)
+    corr_type = st.radio("Select Correlation Type", ["Sector", "Super Sector", "Firm"], horizontal=True,
+                         key="corr_type", persist_state="session")
+    window_options = {"Full history": None, "Last 120 days": 120, "Last 60 days": 60}
+    window_label = st.radio("Return Window", list(window_options), horizontal=True,
+                            key="corr_window", persist_state="session")
+    window = window_options[window_label]
+    suffix = "" if window is None else f" ({window_label})"
+
+    labels = None
+    if corr_type == "Firm":
+        # ✅ Drill down into the firm-level matrix, optionally for a few sectors only
+        with instrumentation.span("load firm sectors"):
+            firm_sectors = data_access.load_firm_sectors()
+        drill_sectors = st.multiselect("Filter Firms by Sector", sorted(firm_sectors.unique()),
+                                       key="corr_sectors", persist_state="session")
+        if drill_sectors:
+            labels = sorted(firm_sectors.index[firm_sectors.isin(drill_sectors)])
+
+    cluster = st.checkbox("🧩 Order by correlation clusters", value=corr_type == "Firm",
+                          key=f"corr_cluster_{corr_type}", persist_state="session")
+
+    level = {"Sector": "sector", "Super Sector": "super_sector", "Firm": "firm"}[corr_type]
+    st.markdown(f"### 🔗 {corr_type}-Level Correlation Matrix")
+    with instrumentation.span("correlation heatmap"):
+        fig = figures.correlation_heatmap(
+            level, window, labels,
+            title=f"{corr_type} Return Correlation Matrix{suffix}",
+            cluster=cluster,
+        )
+        if len(fig.data[0].y) > figures.ANNOTATE_LIMIT:
+            st.caption("Hover over a cell to see its correlation.")
+        figures.show(fig)
 
 # =======================
 # 🧾 Tab 5: Raw Data
 # =======================
-with tab5:
+@tab_fragment
+def raw_data_tab():
     st.subheader("🧾 Explore Raw Data")
     file_map = {
-        "Company Price Changes": "output/company_price_changes.csv",
-        "Sector Summary": "output/sector_price_summary.csv",
-        "Top Movers": "output/top_movers.csv",
-        "Bottom Movers": "output/bottom_movers.csv",
-        "Trend Data": "output/price_trend_data.csv"
+        "Company Price Changes": data_access.COMPANY_PRICE_CHANGES,
+        "Sector Summary": data_access.SECTOR_PRICE_SUMMARY,
+        "Top Movers": data_access.TOP_MOVERS,
+        "Bottom Movers": data_access.BOTTOM_MOVERS,
+        "Trend Data": data_access.PRICE_TREND_DATA
     }
 
-    selected_file = st.selectbox("Select Dataset to View", list(file_map.keys()))
-    df_raw = pd.read_csv(file_map[selected_file])
-    st.dataframe(df_raw, use_container_width=True)
-    st.download_button("📥 Download CSV", df_raw.to_csv(index=False), file_name=selected_file.replace(" ", "_") + ".csv")
+    selected_file = st.selectbox("Select Dataset to View", list(file_map.keys()),
+                                 key="raw_file", persist_state="session")
+    path = file_map[selected_file]
+    with instrumentation.span("load table"):
+        df_raw = data_access.load_table(path)
+
+    # Filters are kept per dataset, since each has its own columns
+    columns = st.multiselect("🧩 Columns", list(df_raw.columns), default=list(df_raw.columns),
+                             key=f"raw_columns_{selected_file}", persist_state="session")
+
+    # ✅ Filter and sort on the server; only the current page goes to the browser
+    with st.expander("🔎 Filter & Sort"):
+        raw_firms = st.multiselect("🏢 Firm", sorted(df_raw["Firm"].dropna().unique()),
+                                   key=f"raw_firms_{selected_file}", persist_state="session") \
+            if "Firm" in df_raw.columns else []
+        raw_sectors = st.multiselect("🏷️ Sector", sorted(df_raw["Sector"].dropna().unique()),
+                                     key=f"raw_sectors_{selected_file}", persist_state="session") \
+            if "Sector" in df_raw.columns else []
+        raw_start = raw_end = None
+        if "Date" in df_raw.columns:
+            first_date = df_raw["Date"].min().date()
+            last_date = df_raw["Date"].max().date()
+            raw_start, raw_end = st.slider("📅 Date", min_value=first_date, max_value=last_date,
+                                           value=(first_date, last_date), format="YYYY-MM-DD",
+                                           key=f"raw_dates_{selected_file}", persist_state="session")
+        sort_by = st.selectbox("↕️ Sort By", ["(default order)"] + list(df_raw.columns),
+                               key=f"raw_sort_{selected_file}", persist_state="session")
+        descending = st.checkbox("Descending", value=False,
+                                 key=f"raw_descending_{selected_file}", persist_state="session")
+
+    with instrumentation.span("filter & sort rows"):
+        rows = data_access.table_rows(
+            path, raw_firms, raw_sectors, raw_start, raw_end,
+            sort_by=None if sort_by == "(default order)" else sort_by,
+            descending=descending,
+        )
+
+    page_size = st.selectbox("Rows per Page", [50, 100, 500, 1000], index=1,
+                             key="raw_page_size", persist_state="session")
+    num_pages = max(1, -(-len(rows) // page_size))
+    page = st.number_input(f"Page (of {num_pages:,})", min_value=1, max_value=num_pages, value=1)
+    page_rows = rows[(page - 1) * page_size:page * page_size]
+    st.caption(f"Showing rows {(page - 1) * page_size + min(1, len(page_rows)):,}–"
+               f"{(page - 1) * page_size + len(page_rows):,} of {len(rows):,}")
+    with instrumentation.span("show page"):
+        st.dataframe(data_access.page_frame(df_raw, page_rows, columns), use_container_width=True)
+
+    # ✅ The download is only produced when clicked; an unfiltered CSV is sent straight from disk
+    download_format = st.radio("Download Format", ["CSV", "Parquet"], horizontal=True,
+                               key="raw_format", persist_state="session")
+    base_name = selected_file.replace(" ", "_")
+    # The trend data is served from the snapshot, so it is exported from there too
+    unfiltered = (len(rows) == len(df_raw) and sort_by == "(default order)" and columns == list(df_raw.columns)
+                  and path != data_access.PRICE_TREND_DATA)
+    if download_format == "CSV" and unfiltered:
+        download = partial(data_access.read_bytes, path)
+    else:
+        download = partial(data_access.export_rows, path, rows, columns, download_format.lower())
+    st.download_button(f"📥 Download {download_format}", download,
+                       file_name=f"{base_name}.{download_format.lower()}",
+                       mime="text/csv" if download_format == "CSV" else "application/octet-stream")
+
+
+# --- Tabs ---
+# ✅ Only the open tab runs; a widget inside it reruns just that tab (a fragment)
+TABS = {
+    "📊 Summary": summary_tab,
+    "📈 Performance Charts": performance_tab,
+    "📉 Volatility & Drawdowns": risk_tab,
+    "🔗 Correlation": correlation_tab,
+    "🧾 Raw Data": raw_data_tab,
+}
+for tab, render in zip(st.tabs(list(TABS), key="active_tab", on_change="rerun"), TABS.values()):
+    if tab.open:
+        with tab:
+            render()
+
+data_access.unpin_snapshot()
+instrumentation.finish()
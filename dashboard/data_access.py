@@ -0,0 +1,426 @@
+"""Cached loaders for the dashboard's pipeline outputs.
+
+Streamlit reruns dashboard.py top to bottom on every interaction, so every
+loader here is cached process-wide. The file's mtime is part of the cache
+key: when the pipeline rewrites an output the next rerun misses the cache
+and reads the new file, while unchanged files are served from memory.
+The caches are Streamlit's, declared through instrumentation.py so their
+hits and misses can be counted in debug mode.
+
+Files are read from the published snapshot (see tadawul/snapshot.py) when
+it has a copy of them: a refresh then switches every file at once on the
+next rerun, and a half-written output is never read. The dashboard pins
+the snapshot version at the start of each script run (:func:`pin_snapshot`),
+so a snapshot published mid-rerun cannot mix two versions in one render.
+"""
+import contextlib
+import io
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from tadawul import correlation, indicators, performance, resample, risk_store, schema, snapshot
+
+COMPANY_PRICE_CHANGES = "output/company_price_changes.csv"
+SECTOR_PRICE_SUMMARY = "output/sector_price_summary.csv"
+TOP_MOVERS = "output/top_movers.csv"
+BOTTOM_MOVERS = "output/bottom_movers.csv"
+PRICE_TREND_DATA = "output/price_trend_data.csv"
+SNAPSHOT_DIR = snapshot.SNAPSHOT_DIR
+ROLLUPS = {
+    "Super Sector": "output/rollup_super_sector.csv",
+    "Sector": "output/rollup_sector.csv",
+}
+RISK_TABLE = "outputs/risk_table.csv"
+RISK_SERIES = risk_store.RISK_SERIES_PATH
+RISK_SERIES_COLUMNS = ["Date", "Firm", "Close", "Daily_Return", "Drawdown"]
+CORRELATION_STATE_DIR = correlation.STATE_DIR
+# Written by scheduler.py
+REFRESH_STATE = "outputs/.scheduler_state.json"
+
+CATEGORY_COLUMNS = ["Firm", "Sector", "Super Sector"]
+# The trend data columns Tabs 1 and 2 use; Tab 5 loads every column
+TREND_COLUMNS = ["Date", "Firm", "Sector", "Super Sector", "Close"]
+INDICATOR_INPUTS = ("Date", "Firm", "Close", "Volume")
+MOVERS_COUNT = 5
+
+
+def file_version(path):
+    """Cache key component that changes whenever the file is rewritten."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# The snapshot version pinned for the script run on this thread
+_run = threading.local()
+
+
+def pin_snapshot():
+    """Read the published snapshot version once for this script run; returns it."""
+    _run.version = snapshot.current_version(SNAPSHOT_DIR)
+    return _run.version
+
+
+def unpin_snapshot():
+    _run.__dict__.pop("version", None)
+
+
+@contextlib.contextmanager
+def pinned_snapshot():
+    """Pin the snapshot for the block, unless this thread's run already has.
+
+    For a fragment rerun, which does not pass the top of the script.
+    """
+    if hasattr(_run, "version"):
+        yield _run.version
+        return
+    try:
+        yield pin_snapshot()
+    finally:
+        unpin_snapshot()
+
+
+def published_version():
+    """The snapshot version pinned for this run, else the current one."""
+    return _run.version if hasattr(_run, "version") else snapshot.current_version(SNAPSHOT_DIR)
+
+
+def published(path):
+    """The snapshot's copy of ``path``, or ``path`` itself if it has none."""
+    version = published_version()
+    return (version and snapshot.file_path(version, path, SNAPSHOT_DIR)) or path
+
+
+def load_refresh_state(path=REFRESH_STATE):
+    """The refresh scheduler's state and last run, or None if it never ran."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+@instrumentation.cache_data(show_spinner=False, max_entries=32)
+def _read_csv(path, version, index_col=None):
+    return pd.read_csv(path, index_col=index_col)
+
+
+def load_csv(path, index_col=None):
+    """Small pipeline output, copied per caller so it can be modified freely."""
+    path = published(path)
+    return _read_csv(path, file_version(path), index_col=index_col)
+
+
+def trend_version(path=PRICE_TREND_DATA):
+    """Cache key of the trend data: the published snapshot, else the CSV's version.
+
+    The snapshot is the one pinned for this run (see :func:`pin_snapshot`),
+    so a newly published snapshot is picked up on the next rerun.
+    """
+    version = published_version()
+    return ("snapshot", version) if version is not None else file_version(path)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=4)
+def _read_trend_data(path, version, columns=tuple(TREND_COLUMNS)):
+    columns = None if columns is None else list(columns)
+    if version[0] == "snapshot":
+        # Memory-mapped and already in (Firm, Date) order; shared by all processes
+        return snapshot.load(version[1], SNAPSHOT_DIR, columns)
+    # Typed and projected by the shared schema (categorical names, float32 prices)
+    df = schema.read_prices(path, columns)
+    # Each firm's history becomes one contiguous, Date-sorted block of rows
+    return df.sort_values(["Firm", "Date"], kind="stable", ignore_index=True)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=4)
+def _read_trend_bars(path, version, resolution, columns=tuple(TREND_COLUMNS)):
+    if version[0] == "snapshot":
+        try:
+            return snapshot.load(version[1], SNAPSHOT_DIR, None if columns is None else list(columns), resolution)
+        except FileNotFoundError:
+            pass  # Published before weekly/monthly bars were
+    bars = resample.bars(_read_trend_data(path, version, None), resolution)
+    return bars if columns is None else bars[[col for col in columns if col in bars.columns]]
+
+
+def _trend_frame(path, version, columns=tuple(TREND_COLUMNS), resolution="daily"):
+    if resolution == "daily":
+        return _read_trend_data(path, version, columns)
+    return _read_trend_bars(path, version, resolution, columns)
+
+
+def load_trend_data(path=PRICE_TREND_DATA, columns=TREND_COLUMNS, resolution="daily"):
+    """The firm-level price history shared by every session and tab.
+
+    Only ``columns`` are loaded (None for every schema column).
+    ``resolution`` "weekly" or "monthly" gives the precomputed OHLCV bars
+    instead (see tadawul/resample.py), one row per firm and period. The
+    same DataFrame object is returned to all callers, so treat it as
+    read-only and ``.copy()`` before modifying it.
+    """
+    columns = None if columns is None else tuple(columns)
+    return _trend_frame(path, trend_version(path), columns, resolution)
+
+
+class TrendIndex:
+    """Per-firm row offsets into the (Firm, Date)-sorted trend data.
+
+    A (firms, date range) query becomes two binary searches inside each
+    selected firm's block, so no boolean mask over the full history is built.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.dates = df["Date"].to_numpy()
+        codes = df["Firm"].cat.codes.to_numpy()
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+        stops = np.append(starts[1:], len(df))
+        names = df["Firm"].cat.categories[codes[starts]]
+        self.offsets = dict(zip(names, zip(starts.tolist(), stops.tolist())))
+
+    def rows(self, firms, start=None, end=None):
+        """Positional row numbers of ``firms`` with start <= Date <= end (dates inclusive)."""
+        lo_key = None if start is None else np.datetime64(pd.Timestamp(start))
+        hi_key = None if end is None else np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1))
+        parts = []
+        for firm in firms:
+            bounds = self.offsets.get(firm)
+            if bounds is None:
+                continue
+            lo, hi = bounds
+            block = self.dates[lo:hi]
+            if hi_key is not None:
+                hi = lo + np.searchsorted(block, hi_key, side="left")
+            if lo_key is not None:
+                lo = lo + np.searchsorted(block, lo_key, side="left")
+            parts.append(np.arange(lo, hi))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+    def slice(self, firms, start=None, end=None):
+        return self.df.iloc[self.rows(firms, start, end)]
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=6)
+def _build_trend_index(path, version, resolution="daily"):
+    return TrendIndex(_trend_frame(path, version, resolution=resolution))
+
+
+def load_trend_index(path=PRICE_TREND_DATA, resolution="daily"):
+    return _build_trend_index(path, trend_version(path), resolution)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=6)
+def _build_indicator_index(path, version, resolution="daily"):
+    if resolution == "daily":
+        # One pass over all firms; each chart then slices its firms out of it
+        return TrendIndex(indicators.compute(_read_trend_data(path, version, INDICATOR_INPUTS)))
+    # A weekly/monthly point is the indicator on the bar's last trading day
+    daily = _build_indicator_index(path, version).df
+    periods = pd.PeriodIndex(daily["Date"], freq=resample.RESOLUTIONS[resolution]).asi8
+    codes = daily["Firm"].cat.codes.to_numpy()
+    last = np.append((np.diff(codes) != 0) | (np.diff(periods) != 0), True)
+    return TrendIndex(daily[last].reset_index(drop=True))
+
+
+def load_indicators(firms, start=None, end=None, resolution="daily", path=PRICE_TREND_DATA):
+    """Technical indicators of ``firms`` between two dates (see tadawul/indicators.py).
+
+    All firms are computed together once per data version and resolution;
+    a call only slices the selected firms' rows out of the cached frame.
+    """
+    return _build_indicator_index(path, trend_version(path), resolution).slice(firms, start, end)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=2)
+def _build_performance_index(path, version):
+    return performance.PerformanceIndex(_read_trend_data(path, version))
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=64)
+def _window_performance(path, version, start, end, n):
+    changes = _build_performance_index(path, version).price_changes(start, end)
+    return {
+        "changes": changes,
+        "sector_summary": performance.sector_summary(changes),
+        "top": performance.movers(changes, n, top=True),
+        "bottom": performance.movers(changes, n, top=False),
+    }
+
+
+def window_performance(start, end, n=MOVERS_COUNT, path=PRICE_TREND_DATA):
+    """% change per firm, sector summary and top/bottom ``n`` between two dates.
+
+    Returns a dict with "changes", "sector_summary", "top" and "bottom"
+    frames, shared across sessions and therefore read-only.
+    """
+    return _window_performance(path, trend_version(path), start, end, n)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=2)
+def _firm_sectors(path, version):
+    df = _read_trend_data(path, version)
+    firsts = df.drop_duplicates("Firm")
+    return pd.Series(firsts["Sector"].astype(str).to_numpy(), index=firsts["Firm"].astype(str).to_numpy())
+
+
+def load_firm_sectors(path=PRICE_TREND_DATA):
+    """Firm -> Sector lookup taken from the trend data."""
+    return _firm_sectors(path, trend_version(path))
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=4)
+def _read_rollup(path, version):
+    df = pd.read_csv(path, parse_dates=["Date"], index_col="Date")
+    return df.sort_index(kind="stable")
+
+
+def load_rollup(level):
+    """Daily Close sum/count per Super Sector or Sector, indexed by sorted Date."""
+    path = published(ROLLUPS[level])
+    return _read_rollup(path, file_version(path))
+
+
+def rollup_average(level, start, end, resolution="daily"):
+    """Average Close per day and group between ``start`` and ``end`` inclusive.
+
+    The rollup is indexed by a sorted DatetimeIndex, so the date window is
+    two binary searches instead of a mask over the whole history. A weekly
+    or monthly ``resolution`` keeps each group's last trading day per period.
+    """
+    rollup = load_rollup(level)
+    window = rollup.loc[pd.Timestamp(start):pd.Timestamp(end)]
+    average = pd.DataFrame({
+        "Date": window.index,
+        level: window[level].to_numpy(),
+        "Close": (window["Close_Sum"] / window["Close_Count"]).to_numpy(),
+    })
+    freq = resample.RESOLUTIONS[resolution]
+    if freq is None:
+        return average
+    periods = pd.DataFrame({level: average[level], "Period": window.index.to_period(freq).asi8})
+    return average[~periods.duplicated(keep="last").to_numpy()].reset_index(drop=True)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=2)
+def _open_risk_store(path, version):
+    return risk_store.open_store(path)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=1024)
+def _read_firm_risk(path, version, firm):
+    return risk_store.read_firms([firm], columns=RISK_SERIES_COLUMNS,
+                                 store=_open_risk_store(path, version))
+
+
+def load_risk_series(firms, path=RISK_SERIES):
+    """Return and drawdown series of ``firms`` from the firm-partitioned store.
+
+    Each firm is read and cached on its own, so adding a firm to the
+    selection reads one row group and reuses the rest.
+    """
+    path = published(path)
+    version = file_version(path)
+    frames = [_read_firm_risk(path, version, firm) for firm in firms]
+    if not frames:
+        return pd.DataFrame(columns=RISK_SERIES_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=16)
+def _read_correlation(path, version):
+    return correlation.StreamingCorrelation.load(path).corr()
+
+
+def correlation_path(level, window=None):
+    return published(correlation.state_path(level, window, CORRELATION_STATE_DIR))
+
+
+def load_correlation(level, window=None):
+    """Correlation matrix of a level ("sector", "super_sector", "firm").
+
+    ``window`` picks a rolling 60/120-day state instead of the full history.
+    The matrix is shared across sessions, so treat it as read-only.
+    """
+    path = correlation_path(level, window)
+    return _read_correlation(path, file_version(path))
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=8)
+def _read_table(path, version):
+    df = pd.read_csv(path)
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def table_version(path):
+    return trend_version(path) if path == PRICE_TREND_DATA else file_version(published(path))
+
+
+def load_table(path):
+    """Any pipeline output for the raw data viewer, shared and read-only."""
+    if path == PRICE_TREND_DATA:
+        return load_trend_data(path, columns=None)
+    path = published(path)
+    return _read_table(path, file_version(path))
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=32)
+def _table_rows(path, version, firms, sectors, start, end, sort_by, descending):
+    df = load_table(path)
+    mask = np.ones(len(df), dtype=bool)
+    if firms:
+        mask &= df["Firm"].isin(firms).to_numpy()
+    if sectors:
+        mask &= df["Sector"].isin(sectors).to_numpy()
+    if start is not None:
+        mask &= (df["Date"] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (df["Date"] < pd.Timestamp(end) + pd.Timedelta(days=1)).to_numpy()
+    rows = np.flatnonzero(mask)
+    if sort_by is not None:
+        key = df[sort_by].iloc[rows].reset_index(drop=True)
+        order = key.sort_values(ascending=not descending, kind="stable", na_position="last").index
+        rows = rows[order.to_numpy()]
+    return rows
+
+
+def table_rows(path, firms=(), sectors=(), start=None, end=None, sort_by=None, descending=False):
+    """Positions of the rows of ``path`` that pass the filters, in display order.
+
+    Filtering and sorting happen here, once per distinct query, so paging
+    through the result only slices this array.
+    """
+    return _table_rows(path, table_version(path), tuple(firms), tuple(sectors),
+                       start, end, sort_by, descending)
+
+
+def page_frame(df, rows, columns):
+    """Rows and columns of ``df`` for display, float32 prices shown to 4 decimals."""
+    page = df.iloc[rows][columns]
+    floats = [col for col in columns if page[col].dtype == "float32"]
+    return page.astype({col: "float64" for col in floats}).round({col: 4 for col in floats})
+
+
+def read_bytes(path):
+    with open(published(path), "rb") as f:
+        return f.read()
+
+
+def export_rows(path, rows, columns, fmt="csv"):
+    """CSV or Parquet bytes of the given rows and columns of ``path``."""
+    df = load_table(path).iloc[rows][columns]
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    return df.to_csv(index=False).encode()
+
@@ -0,0 +1,266 @@
+"""Plotly figures that are built once and reused across reruns.
+
+The dashboard's house style (transparent backgrounds, black text, legend
+centred under the plot) is registered once as the ``tadawul`` Plotly
+template and made the default, so figures no longer repeat the same
+``update_layout`` block.
+
+Figures are cached process-wide like the data in data_access.py, keyed by
+(chart, version of the file drawn from, selection), so a rerun with the
+same inputs re-sends an already built figure instead of building it again.
+Cached figures are shared across sessions: pass them to :func:`show` and
+do not modify them.
+"""
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+from plotly.subplots import make_subplots
+
+import data_access
+import instrumentation
+from tadawul.correlation import cluster_order
+from tadawul.downsample import minmax_positions
+from tadawul.resample import pick_resolution
+
+HOUSE_TEMPLATE = "tadawul"
+# Cell values are written into the heatmap only up to this many rows;
+# larger matrices show them on hover instead
+ANNOTATE_LIMIT = 30
+# Tick labels stop being readable beyond this many rows
+TICK_LABEL_LIMIT = 100
+# Min/max buckets per line: about one per 3 px of a ~900 px wide plot
+LINE_BUCKETS = 300
+# Tab 2 indicators: {label: ((column, line dash), ...)}, drawn in each firm's colour.
+# Overlays share the price axis; panels get a row of their own under it.
+INDICATOR_OVERLAYS = {
+    "SMA 20": (("SMA_20", "dash"),),
+    "SMA 50": (("SMA_50", "longdash"),),
+    "EMA 20": (("EMA_20", "dashdot"),),
+    "Bollinger Bands (20, 2σ)": (("BB_Upper", "dot"), ("BB_Lower", "dot")),
+}
+INDICATOR_PANELS = {
+    "RSI (14)": (("RSI_14", "solid"),),
+    "MACD (12, 26, 9)": (("MACD", "solid"), ("MACD_Signal", "dot")),
+    "Volume MA (20)": (("Volume_SMA_20", "solid"),),
+}
+INDICATORS = [*INDICATOR_OVERLAYS, *INDICATOR_PANELS]
+PANEL_HEIGHT = 160
+
+
+def register_template():
+    black = dict(color="black")
+    pio.templates[HOUSE_TEMPLATE] = go.layout.Template(layout=dict(
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=black,
+        xaxis=dict(title_font=black, tickfont=black),
+        yaxis=dict(title_font=black, tickfont=black),
+        legend=dict(orientation="h", yanchor="top", y=-0.3, xanchor="center", x=0.5,
+                    font=dict(size=10)),
+    ))
+    pio.templates.default = f"plotly_white+{HOUSE_TEMPLATE}"
+
+
+register_template()
+
+
+def show(fig):
+    # Streamlit's own chart theme would override the template's layout
+    with instrumentation.span("send chart"):
+        st.plotly_chart(fig, use_container_width=True, theme=None)
+
+
+def _no_legend_title(fig):
+    # Plotly Express titles the legend after the colour column
+    return fig.update_layout(legend_title_text=None)
+
+
+def downsample_lines(df, series, y="Close", buckets=LINE_BUCKETS):
+    """Thin a long-format line frame to the pixel budget of each ``series``.
+
+    Returns (frame, thinned). Series keep their first-appearance order, so
+    legend colours do not change; a narrower date range keeps more of the
+    rows, down to full daily resolution.
+    """
+    codes, _ = pd.factorize(df[series])
+    order = codes.argsort(kind="stable")
+    positions = minmax_positions(codes[order], df[y].to_numpy()[order], buckets)
+    return df.iloc[order[positions]], len(positions) < len(df)
+
+
+def _line(df, series, title, resolution="daily"):
+    points, thinned = downsample_lines(df, series)
+    if resolution != "daily":
+        title = f"{title} ({resolution} closes)"
+    fig = px.line(points, x="Date", y="Close", color=series, title=title)
+    # Prices are float32; show them as the exchange quotes them
+    fig.update_traces(yhoverformat=",.2f")
+    return _no_legend_title(fig), thinned or resolution != "daily"
+
+
+# ==== Tab 1: % change bars ====
+@instrumentation.cache_resource(show_spinner=False, max_entries=64)
+def _pct_change_bar(path, version, view, start, end, firms, title):
+    data = data_access.window_performance(start, end, path=path)[view]
+    if firms is not None:
+        data = data[data["Firm"].isin(firms)]
+    return _no_legend_title(px.bar(data, x="Firm", y="Pct_Change", color="Sector", title=title))
+
+
+def pct_change_bar(view, start, end, title, firms=None):
+    """% change per firm between two dates.
+
+    ``view`` picks a frame of data_access.window_performance(): "changes"
+    (optionally for ``firms`` only), "top" or "bottom".
+    """
+    path = data_access.PRICE_TREND_DATA
+    firms = None if firms is None else tuple(firms)
+    return _pct_change_bar(path, data_access.trend_version(path), view, start, end, firms, title)
+
+
+def _with_indicators(fig, rows, chosen):
+    """Add the ``chosen`` indicators of ``rows`` to a price line figure."""
+    colors = {trace.name: trace.line.color for trace in fig.data}
+    panels = [label for label in chosen if label in INDICATOR_PANELS]
+    out = make_subplots(rows=1 + len(panels), cols=1, shared_xaxes=True, vertical_spacing=0.03,
+                        row_heights=[3] + [1] * len(panels))
+    out.add_traces(list(fig.data), rows=1, cols=1)
+    out.update_layout(title=fig.layout.title, height=450 + PANEL_HEIGHT * len(panels))
+    out.update_yaxes(title_text="Close", row=1, col=1)
+
+    rows_of = {label: 1 for label in chosen if label in INDICATOR_OVERLAYS}
+    rows_of.update({label: 2 + i for i, label in enumerate(panels)})
+    for firm, group in rows.groupby("Firm", observed=True, sort=False):
+        for label, row in rows_of.items():
+            for column, dash in {**INDICATOR_OVERLAYS, **INDICATOR_PANELS}[label]:
+                # Grouped with the firm, so its legend entry toggles them too
+                out.add_trace(go.Scatter(
+                    x=group["Date"], y=group[column], mode="lines", name=f"{firm} {column}",
+                    legendgroup=firm, showlegend=False, line=dict(color=colors.get(firm), dash=dash, width=1),
+                    yhoverformat=",.0f" if column.startswith("Volume") else ",.2f",
+                ), row=row, col=1)
+    for i, label in enumerate(panels):
+        out.update_yaxes(title_text=label, row=2 + i, col=1)
+        if label.startswith("RSI"):
+            out.update_yaxes(range=[0, 100], row=2 + i, col=1)
+            for level in (30, 70):
+                out.add_hline(y=level, line=dict(color="grey", dash="dot", width=1), row=2 + i, col=1)
+    return out
+
+
+def indicator_note(chosen):
+    """Caption naming the line style of each chosen indicator."""
+    styles = {**INDICATOR_OVERLAYS, **INDICATOR_PANELS}
+    parts = [f"{label} {'/'.join(dict.fromkeys(dash for _, dash in styles[label]))}" for label in chosen]
+    return "Indicators are drawn in each firm's colour: " + ", ".join(parts) + "."
+
+
+# ==== Tab 1/2: price trends ====
+# Long date ranges are drawn from weekly or monthly closes, picked so a
+# line has at most about one point per bucket
+@instrumentation.cache_resource(show_spinner=False, max_entries=64)
+def _firm_trend(path, version, firms, start, end, title, resolution, chosen=()):
+    rows = data_access.load_trend_index(path, resolution).slice(firms, start, end)
+    fig, thinned = _line(rows, "Firm", title, resolution)
+    if chosen:
+        # Precomputed for all firms per data version; only sliced here
+        values = data_access.load_indicators(firms, start, end, resolution, path)
+        fig = _with_indicators(fig, values, chosen)
+    return fig, thinned
+
+
+def firm_trend(firms, start, end, title, indicators=()):
+    """Close of ``firms`` between two dates; returns (figure, thinned).
+
+    ``indicators`` are labels of INDICATORS to add to the chart.
+    """
+    path = data_access.PRICE_TREND_DATA
+    resolution = pick_resolution(start, end, LINE_BUCKETS)
+    chosen = tuple(label for label in INDICATORS if label in indicators)
+    return _firm_trend(path, data_access.trend_version(path), tuple(firms), start, end, title, resolution, chosen)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=32)
+def _group_trend(level, version, start, end, title, resolution):
+    return _line(data_access.rollup_average(level, start, end, resolution), level, title, resolution)
+
+
+def group_trend(level, start, end, title):
+    """Average Close per Super Sector or Sector; returns (figure, thinned)."""
+    version = data_access.file_version(data_access.published(data_access.ROLLUPS[level]))
+    return _group_trend(level, version, start, end, title, pick_resolution(start, end, LINE_BUCKETS))
+
+
+# ==== Tab 3: drawdowns ====
+@instrumentation.cache_resource(show_spinner=False, max_entries=512)
+def _drawdown_area(path, version, firm):
+    firm_risk = data_access.load_risk_series([firm], path).set_index("Date")
+    fig = px.area(firm_risk["Drawdown"], title=f"{firm} Drawdown", labels={"value": "Drawdown"})
+    return _no_legend_title(fig)
+
+
+def drawdown_area(firm, path=data_access.RISK_SERIES):
+    path = data_access.published(path)
+    return _drawdown_area(path, data_access.file_version(path), firm)
+
+
+@instrumentation.cache_resource(show_spinner=False, max_entries=32)
+def _drawdown_lines(path, version, firms):
+    risk_data = data_access.load_risk_series(list(firms), path)
+    fig = px.line(risk_data, x="Date", y="Drawdown", color="Firm", title="Drawdown of Selected Firms")
+    return _no_legend_title(fig)
+
+
+def drawdown_lines(firms, path=data_access.RISK_SERIES):
+    path = data_access.published(path)
+    return _drawdown_lines(path, data_access.file_version(path), tuple(firms))
+
+
+# ==== Tab 4: correlation heatmaps ====
+@instrumentation.cache_resource(show_spinner=False, max_entries=32)
+def _correlation_heatmap(level, window, version, labels, title, cluster):
+    corr = data_access.load_correlation(level, window)
+    labels = sorted(corr.index) if labels is None else [label for label in labels if label in corr.index]
+    corr = corr.loc[labels, labels]
+    if cluster:
+        order = cluster_order(corr.to_numpy())
+        corr = corr.iloc[order, order]
+
+    size = len(corr)
+    annotate = size <= ANNOTATE_LIMIT
+    fig = go.Figure(go.Heatmap(
+        z=corr.to_numpy(),
+        x=corr.columns.tolist(),
+        y=corr.index.tolist(),
+        colorscale="Blues",
+        zmid=0,
+        xgap=1 if annotate else 0,
+        ygap=1 if annotate else 0,
+        texttemplate="%{z:.2f}" if annotate else None,
+        hovertemplate="%{y} × %{x}<br>Correlation: %{z:.2f}<extra></extra>",
+        colorbar=dict(len=0.75),
+    ))
+    show_ticks = size <= TICK_LABEL_LIMIT
+    fig.update_layout(
+        title=dict(text=title, font=dict(size=18)),
+        height=700 if size <= ANNOTATE_LIMIT else min(1600, max(700, 5 * size)),
+        plot_bgcolor="#E0E0E0",
+        xaxis=dict(showticklabels=show_ticks, showgrid=False),
+        yaxis=dict(showticklabels=show_ticks, showgrid=False, autorange="reversed"),
+        margin=dict(l=40, r=40, t=60, b=40),
+    )
+    return fig
+
+
+def correlation_heatmap(level, window=None, labels=None, title="", cluster=False):
+    """Cached heatmap of a saved correlation matrix.
+
+    ``labels`` restricts the matrix to a subset (e.g. the firms of a few
+    sectors); ``cluster`` reorders rows and columns so correlated series
+    form blocks.
+    """
+    version = data_access.file_version(data_access.correlation_path(level, window))
+    labels = None if labels is None else tuple(labels)
+    return _correlation_heatmap(level, window, version, labels, title, cluster)
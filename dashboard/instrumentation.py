@@ -0,0 +1,255 @@
+"""Per-rerun timings for the dashboard, switched on with TADAWUL_DEBUG=1.
+
+    TADAWUL_DEBUG=1 streamlit run dashboard/dashboard.py
+
+dashboard.py wraps each load, transform and chart step in :func:`span`,
+and each tab is a :func:`fragment` that gets a span of its own.
+The cached loaders in data_access.py and figures.py are declared with
+:func:`cache_data` / :func:`cache_resource`, which count how often each
+cache is called and how often it had to compute (the computation gets a
+span of its own). Every message sent to the browser is counted and sized.
+At the end of the rerun :func:`finish` shows the span tree, cache hits
+and misses and bytes sent in the sidebar, and appends the rerun as one
+JSON line to the log file (TADAWUL_DEBUG_LOG, default
+outputs/dashboard_timings.jsonl). Summarise a log with:
+
+    python dashboard/instrumentation.py outputs/dashboard_timings.jsonl
+
+When TADAWUL_DEBUG is not set, :func:`span` returns a shared no-op
+context manager and the cache decorators are Streamlit's own, so the
+instrumentation costs one function call per span.
+"""
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import streamlit as st
+
+ENABLED = os.environ.get("TADAWUL_DEBUG", "") not in ("", "0")
+LOG_PATH = os.environ.get("TADAWUL_DEBUG_LOG", "outputs/dashboard_timings.jsonl")
+
+_NO_SPAN = contextlib.nullcontext()
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+class Trace:
+    """Spans, cache counts and sent bytes of one script run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall_time = time.time()
+        self.spans = []  # [name, depth, start, seconds]
+        self.depth = 0
+        self.calls = Counter()
+        self.misses = Counter()
+        self.messages = 0
+        self.bytes_sent = 0
+
+    def as_dict(self, session_id=None):
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.wall_time)),
+            "session": session_id,
+            "seconds": round(time.perf_counter() - self.started, 4),
+            "spans": [{"name": name, "depth": depth, "start": round(start, 4), "seconds": round(seconds, 4)}
+                      for name, depth, start, seconds in self.spans if seconds is not None],
+            "cache": {name: {"calls": calls, "misses": self.misses[name]} for name, calls in self.calls.items()},
+            "messages": self.messages,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+def _current():
+    return getattr(_local, "trace", None)
+
+
+@contextlib.contextmanager
+def _timed(trace, name):
+    record = [name, trace.depth, time.perf_counter() - trace.started, None]
+    trace.spans.append(record)
+    trace.depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record[3] = time.perf_counter() - started
+        trace.depth -= 1
+
+
+def span(name):
+    """Context manager timing one step of the current rerun."""
+    if not ENABLED:
+        return _NO_SPAN
+    trace = _current()
+    return _NO_SPAN if trace is None else _timed(trace, name)
+
+
+# ==== Cache hit/miss counting ====
+def _counted(cache, func):
+    name = func.__name__.lstrip("_")
+
+    @functools.wraps(func)
+    def compute(*args, **kwargs):
+        # Only runs on a cache miss
+        trace = _current()
+        if trace is None:
+            return func(*args, **kwargs)
+        trace.misses[name] += 1
+        with _timed(trace, f"{name} (computed)"):
+            return func(*args, **kwargs)
+
+    cached = cache(compute)
+
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        trace = _current()
+        if trace is not None:
+            trace.calls[name] += 1
+        return cached(*args, **kwargs)
+
+    call.clear = cached.clear
+    return call
+
+
+def cache_data(**options):
+    """``st.cache_data(**options)`` that also counts hits and misses when enabled."""
+    if not ENABLED:
+        return st.cache_data(**options)
+    return functools.partial(_counted, st.cache_data(**options))
+
+
+def cache_resource(**options):
+    """``st.cache_resource(**options)`` that also counts hits and misses when enabled."""
+    if not ENABLED:
+        return st.cache_resource(**options)
+    return functools.partial(_counted, st.cache_resource(**options))
+
+
+# ==== Rerun lifecycle ====
+def _script_context():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    return get_script_run_ctx()
+
+
+def _begin():
+    trace = _local.trace = Trace()
+    ctx = _script_context()
+    if ctx is None or not hasattr(ctx, "_enqueue"):
+        return trace
+    # Count what is sent to the browser; undone in finish()
+    enqueue = getattr(ctx._enqueue, "original", ctx._enqueue)
+
+    def counting_enqueue(msg):
+        trace.messages += 1
+        trace.bytes_sent += msg.ByteSize()
+        enqueue(msg)
+
+    counting_enqueue.original = enqueue
+    ctx._enqueue = counting_enqueue
+    return trace
+
+
+def start():
+    """Begin recording a rerun (no-op unless enabled)."""
+    if ENABLED:
+        _begin()
+
+
+def _stop(trace):
+    _local.trace = None
+    ctx = _script_context()
+    if ctx is not None and hasattr(getattr(ctx, "_enqueue", None), "original"):
+        ctx._enqueue = ctx._enqueue.original
+    return ctx
+
+
+def _append_log(record):
+    directory = os.path.dirname(LOG_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _log_lock, open(LOG_PATH, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def finish():
+    """Stop recording, log the rerun and show it in the sidebar."""
+    trace = _current() if ENABLED else None
+    if trace is None:
+        return
+    ctx = _stop(trace)
+    record = trace.as_dict(getattr(ctx, "session_id", None))
+    _append_log(record)
+
+    with st.sidebar.expander("🛠 Rerun timings", expanded=False):
+        st.markdown(f"**{record['seconds'] * 1000:,.0f} ms** script time · "
+                    f"**{record['bytes_sent'] / 1024:,.1f} KB** in {record['messages']} messages")
+        st.dataframe(
+            [{"Span": "│ " * row["depth"] + row["name"], "ms": round(row["seconds"] * 1000, 1),
+              "Start ms": round(row["start"] * 1000, 1)} for row in record["spans"]],
+            use_container_width=True, hide_index=True,
+        )
+        st.dataframe(
+            [{"Cache": name, "Calls": counts["calls"], "Hits": counts["calls"] - counts["misses"],
+              "Misses": counts["misses"]} for name, counts in sorted(record["cache"].items())],
+            use_container_width=True, hide_index=True,
+        )
+        st.caption(f"Logged to {LOG_PATH}")
+
+
+def fragment(func):
+    """``st.fragment(func)``, spanned inside a full rerun and logged on its own otherwise.
+
+    A widget inside a fragment reruns only that function. Those reruns go
+    to the log with a "fragment" field; the sidebar panel is left as it
+    was, since a fragment cannot write outside its own container.
+    """
+    if not ENABLED:
+        return st.fragment(func)
+    name = func.__name__
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        trace = _current()
+        if trace is not None:
+            with _timed(trace, name):
+                return func(*args, **kwargs)
+        # Fragment-only rerun
+        trace = _begin()
+        try:
+            with _timed(trace, name):
+                return func(*args, **kwargs)
+        finally:
+            ctx = _stop(trace)
+            _append_log({**trace.as_dict(getattr(ctx, "session_id", None)), "fragment": name})
+
+    return st.fragment(run)
+
+
+# ==== Log summary ====
+def summarize(path=LOG_PATH):
+    """Median, p95 and max milliseconds per span name over a timing log."""
+    import pandas as pd
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    spans = pd.DataFrame([row for record in records for row in record["spans"]])
+    stats = spans.groupby("name")["seconds"].describe(percentiles=[0.5, 0.95])
+    for label, fragment in [("(whole rerun)", False), ("(fragment rerun)", True)]:
+        reruns = pd.Series([record["seconds"] for record in records if ("fragment" in record) == fragment])
+        if len(reruns):
+            stats.loc[label] = reruns.describe(percentiles=[0.5, 0.95])
+    table = (stats[["count", "50%", "95%", "max"]] * [1, 1000, 1000, 1000]).round(1)
+    table.columns = ["count", "median ms", "p95 ms", "max ms"]
+    return table.sort_values("p95 ms", ascending=False)
+
+
+if __name__ == "__main__":
+    print(summarize(sys.argv[1] if len(sys.argv) > 1 else LOG_PATH).to_string())
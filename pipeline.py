@@ -0,0 +1,153 @@
+"""Run the whole analysis pipeline in one process.
+
+    ingest -> clean_names -> analyse -> correlations --> snapshot
+                                     -> tab1 ----------/
+
+DataFrames are handed between stages in memory, so the intermediate
+outputs/final_cleaned_data.csv is no longer written or re-read; only the
+artifacts the dashboard and reports use are saved. The correlation and
+Tab 1 stages run concurrently, and stages whose code and inputs have not
+changed since the last run are skipped. The functions here are thin
+wrappers, so each stage lists the modules doing its work in ``code=`` to
+make their edits count as changes. The snapshot stage publishes the typed
+price history as a memory-mappable, versioned snapshot for the
+dashboard (see tadawul/snapshot.py), together with weekly and monthly
+OHLCV bars of it (see tadawul/resample.py) and copies of the other files
+the dashboard reads. It first validates them: if anything is missing,
+empty or older than what is already published, the stage fails and the
+dashboard keeps serving the previous snapshot.
+
+Usage (from the repository root):
+
+    python pipeline.py            # run stale stages only
+    python pipeline.py --force    # run everything
+"""
+import argparse
+import json
+import os
+
+import correlation_analysis
+from scripts import analysis_tab1_performance, cleand_data_analysed
+from tadawul import cleaning, correlation, ingest, resample, risk_store, scraper, snapshot
+from tadawul.cleaning import clean_sector_firm
+from tadawul.dag import Pipeline, Stage, format_report
+
+STATE_PATH = "outputs/.pipeline_state.json"
+# What the dashboard reads besides the price history, published with every snapshot
+DASHBOARD_FILES = [
+    *(f"output/{name}" for name in [
+        "company_price_changes.csv", "sector_price_summary.csv", "top_movers.csv", "bottom_movers.csv",
+        "rollup_super_sector.csv", "rollup_sector.csv"]),
+    "outputs/risk_table.csv",
+    risk_store.RISK_SERIES_PATH,
+    *(correlation.state_path(level, window)
+      for level in correlation.LEVELS for window in (None, *correlation.ROLLING_WINDOWS)),
+]
+
+
+def load_prices():
+    ingest.ingest()
+    return ingest.load_price_store()
+
+
+def analyse(df):
+    return cleand_data_analysed.analyse(df, industry_col='Super Sector')
+
+
+def save_analysis(result):
+    cleand_data_analysed.save_outputs(result[1])
+
+
+def correlations(analysed):
+    return correlation_analysis.compute_correlations(analysed[0])
+
+
+def save_correlations(result):
+    correlation_analysis.save_correlations(result)
+
+
+def tab1(analysed):
+    df = analysed[0]
+    # Days scraped after the report's end date (see scheduler.py) extend the window
+    end_date = max(analysis_tab1_performance.END_DATE, df["Date"].max())
+    return analysis_tab1_performance.build_outputs(df, end_date=end_date)
+
+
+def validate_snapshot(trend, bars, files=DASHBOARD_FILES):
+    """Raise ValueError instead of publishing incomplete or stale data."""
+    problems = []
+    if trend.empty or trend["Close"].isna().all():
+        problems.append("the price history has no prices")
+    for resolution, frame in bars.items():
+        if len(frame) == 0 or frame["Date"].max() != trend["Date"].max():
+            problems.append(f"the {resolution} bars do not end on the last trading day")
+    problems += [f"{path} is missing or empty" for path in files
+                 if not os.path.exists(path) or os.path.getsize(path) == 0]
+    published = snapshot.current_version()
+    if published is not None and not trend.empty:
+        last_published = snapshot.load(published, columns=["Date"])["Date"].max()
+        if trend["Date"].max() < last_published:
+            problems.append(f"it ends on {trend['Date'].max():%Y-%m-%d}, before the published "
+                            f"{last_published:%Y-%m-%d}")
+    if problems:
+        raise ValueError("Not publishing the snapshot: " + "; ".join(problems))
+
+
+def snapshot_prices(analysed, states, outputs):
+    # Runs once the other stages have saved the files published with it.
+    # Published in (Firm, Date) order so the dashboard can use it without sorting
+    trend = outputs["price_trend_data.csv"]
+    trend = trend.sort_values(["Firm", "Date"], kind="stable", ignore_index=True)
+    bars = resample.pyramid(trend)
+    validate_snapshot(trend, bars)
+    return trend, bars
+
+
+def publish_snapshot(result):
+    trend, bars = result
+    snapshot.publish(trend, resolutions=bars, files=DASHBOARD_FILES)
+
+
+def build_pipeline():
+    return Pipeline([
+        # The scraper appends to the store directly and records each firm in its manifest
+        Stage("ingest", load_prices, code=[ingest], outputs=[ingest.STORE_DIR],
+              inputs=[ingest.SOURCE_DIR, os.path.join(ingest.STORE_DIR, scraper.MANIFEST_NAME)]),
+        Stage("clean_names", clean_sector_firm, deps=["ingest"], code=[cleaning]),
+        Stage("analyse", analyse, deps=["clean_names"], save=save_analysis, code=[cleand_data_analysed],
+              outputs=[f"outputs/{name}" for name in [
+                  "monthly_returns.csv", "drawdowns.csv", "risk_table.csv", "risk_series.parquet",
+                  "firm_summary.csv", "industry_performance_summary.csv", "sector_performance_summary.csv"]]),
+        Stage("correlations", correlations, deps=["analyse"], save=save_correlations,
+              code=[correlation_analysis],
+              outputs=[correlation_analysis.SECTOR_OUTPUT, correlation_analysis.SUPER_SECTOR_OUTPUT,
+                       correlation.STATE_DIR]),
+        Stage("tab1", tab1, deps=["analyse"], save=analysis_tab1_performance.save_outputs,
+              code=[analysis_tab1_performance],
+              outputs=[f"output/{name}" for name in [
+                  "company_price_changes.csv", "sector_price_summary.csv", "top_movers.csv",
+                  "bottom_movers.csv", "price_trend_data.csv", "rollup_super_sector.csv",
+                  "rollup_sector.csv"]]),
+        Stage("snapshot", snapshot_prices, deps=["analyse", "correlations", "tab1"], save=publish_snapshot,
+              code=[resample, snapshot],
+              outputs=[snapshot.SNAPSHOT_DIR]),
+    ], STATE_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the dashboard data pipeline.")
+    parser.add_argument("--force", action="store_true", help="run every stage even if nothing changed")
+    parser.add_argument("--workers", type=int, default=4, help="stages allowed to run at once")
+    parser.add_argument("--report-json", metavar="PATH", help="also write the timing report as JSON")
+    args = parser.parse_args()
+
+    report = build_pipeline().run(force=args.force, workers=args.workers)
+    print(format_report(report))
+    if args.report_json:
+        with open(args.report_json, "w") as f:
+            json.dump(report, f, indent=2)
+    print("✅ Pipeline complete")
+
+
+if __name__ == '__main__':
+    main()
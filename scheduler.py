@@ -0,0 +1,231 @@
+"""Refresh the dashboard's data every trading day after the market closes.
+
+A background worker thread sleeps until the next run (RUN_AT Riyadh time,
+Sunday to Thursday), scrapes the new trading days into the price store and
+runs the incremental pipeline. The pipeline's snapshot stage validates the
+new artifacts and publishes them with one atomic pointer rename (see
+pipeline.py and tadawul/snapshot.py), so running dashboard sessions read
+the new data on their next rerun without a restart. A failed run publishes
+nothing and the dashboard keeps the previous snapshot.
+
+Streamlit computes each cache entry once per process while other sessions
+wait for it, and the entries are keyed by snapshot version, so a new
+version does not cause a stampede of identical loads. A lock file makes a
+second scheduler on the same host skip a run instead of running the
+pipeline twice.
+
+The scheduler's state and the timings of its last run are kept in
+outputs/.scheduler_state.json, which the dashboard shows in its sidebar.
+
+Usage (from the repository root):
+
+    python scheduler.py                 # run until Ctrl-C
+    python scheduler.py --once          # refresh now and exit
+    python scheduler.py --once --no-scrape
+    python scheduler.py --status
+"""
+import argparse
+import contextlib
+import datetime
+import fcntl
+import json
+import os
+import threading
+import time
+
+import pipeline
+from tadawul import scraper, snapshot
+from tadawul.dag import format_report
+
+# Saudi Arabia keeps UTC+3 all year
+RIYADH = datetime.timezone(datetime.timedelta(hours=3), "AST")
+TRADING_DAYS = {6, 0, 1, 2, 3}  # Sunday-Thursday
+# Continuous trading ends at 15:00; leave time for the closing auction and the site to update
+RUN_AT = datetime.time(16, 0)
+STATE_PATH = "outputs/.scheduler_state.json"
+LOCK_PATH = "outputs/.refresh.lock"
+
+
+def now():
+    return datetime.datetime.now(RIYADH)
+
+
+def next_run(after, run_at=RUN_AT, holidays=()):
+    """The first trading day's ``run_at`` (Riyadh time) later than ``after``."""
+    after = after.astimezone(RIYADH)
+    day = after.date()
+    while True:
+        due = datetime.datetime.combine(day, run_at, RIYADH)
+        if due > after and day.weekday() in TRADING_DAYS and day not in holidays:
+            return due
+        day += datetime.timedelta(days=1)
+
+
+def refresh(scrape=True, workers=4, browser="edge"):
+    """Scrape the new trading days and run the stale pipeline stages.
+
+    Returns a record of the run: seconds per step, the pipeline's stage
+    report and the snapshot version before and after.
+    """
+    started = time.perf_counter()
+    record = {"started": now().isoformat(timespec="seconds"), "steps": {},
+              "previous_version": snapshot.current_version()}
+    if scrape:
+        step = time.perf_counter()
+        record["scrape"] = scraper.scrape(end=now().date().isoformat(), workers=workers, incremental=True,
+                                          browser=browser, headless=True)
+        record["steps"]["scrape"] = round(time.perf_counter() - step, 3)
+    step = time.perf_counter()
+    record["stages"] = pipeline.build_pipeline().run(workers=workers)
+    record["steps"]["pipeline"] = round(time.perf_counter() - step, 3)
+    record["version"] = snapshot.current_version()
+    record["published"] = record["version"] != record["previous_version"]
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+@contextlib.contextmanager
+def _exclusive(path):
+    # Held for the whole run; released by the OS if the process dies
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class Scheduler:
+    """Background worker calling :func:`refresh` at every :func:`next_run`."""
+
+    def __init__(self, state_path=STATE_PATH, lock_path=LOCK_PATH, run_at=RUN_AT, holidays=(), **refresh_options):
+        self.state_path = state_path
+        self.lock_path = lock_path
+        self.run_at = run_at
+        self.holidays = set(holidays)
+        self.refresh_options = refresh_options
+        # The last run is kept across restarts
+        self.state = load_state(state_path)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _update(self, **changes):
+        with self._lock:
+            self.state.update(changes, updated=now().isoformat(timespec="seconds"))
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.state, f, indent=1)
+            os.replace(tmp, self.state_path)
+
+    def run_once(self):
+        """Refresh now unless another process is already refreshing; returns the run record."""
+        with _exclusive(self.lock_path) as acquired:
+            if not acquired:
+                self._update(status="skipped", message="another refresh was running")
+                return None
+            self._update(status="running", message=None)
+            try:
+                record = {**refresh(**self.refresh_options), "status": "ok"}
+                failed = record.get("scrape", {}).get("failed", 0)
+                if failed:
+                    # Published what was scraped; the failed firms are retried by the next run
+                    record.update(status="partial", error=f"{failed} firm(s) failed to scrape")
+            except Exception as e:
+                # Keep the worker alive; the dashboard still serves the last snapshot
+                record = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            record["finished"] = now().isoformat(timespec="seconds")
+            changes = {"status": record["status"], "last_run": record}
+            if record["status"] != "failed":
+                changes["last_success"] = {"finished": record["finished"], "version": record["version"]}
+            self._update(**changes)
+            return record
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            due = next_run(now(), self.run_at, self.holidays)
+            self._update(next_run=due.isoformat(timespec="seconds"))
+            # Short waits, so a changed system clock is noticed
+            while not self._wake.is_set() and now() < due:
+                self._wake.wait(min(60, (due - now()).total_seconds()))
+            self._wake.clear()
+            if not self._stopping.is_set():
+                self.run_once()
+
+    def start(self):
+        self._update(status="waiting", started=now().isoformat(timespec="seconds"))
+        self._thread = threading.Thread(target=self._loop, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def run_now(self):
+        """Wake the worker for an immediate run."""
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._update(status="stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the dashboard data after every trading day.")
+    parser.add_argument("--once", action="store_true", help="refresh now and exit")
+    parser.add_argument("--status", action="store_true", help="print the scheduler state and exit")
+    parser.add_argument("--no-scrape", dest="scrape", action="store_false", help="only run the pipeline")
+    parser.add_argument("--at", default=RUN_AT.strftime("%H:%M"), help="run time, HH:MM Riyadh time")
+    parser.add_argument("--holiday", action="append", default=[], metavar="YYYY-MM-DD",
+                        help="exchange holiday to skip (repeatable)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--browser", default="edge", choices=["edge", "chrome", "firefox"])
+    args = parser.parse_args()
+
+    if args.status:
+        print(json.dumps(load_state(), indent=1))
+        return
+    scheduler = Scheduler(run_at=datetime.time.fromisoformat(args.at),
+                          holidays=[datetime.date.fromisoformat(day) for day in args.holiday],
+                          scrape=args.scrape, workers=args.workers, browser=args.browser)
+    if args.once:
+        record = scheduler.run_once()
+        if record is None:
+            print("⚠️ Another refresh is running")
+        elif record["status"] == "failed":
+            print(f"❌ Refresh failed: {record['error']}")
+        else:
+            if record["status"] == "partial":
+                print(f"⚠️ {record['error']}; see the scrape manifest")
+            print(format_report(record["stages"]))
+            print(f"✅ Refreshed in {record['seconds']:.1f}s; published snapshot: {record['version']}"
+                  + ("" if record["published"] else " (unchanged)"))
+        return
+
+    scheduler.start()
+    print(f"✅ Scheduler running; next refresh at {next_run(now(), scheduler.run_at, scheduler.holidays):%Y-%m-%d %H:%M} "
+          f"Riyadh time")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
+        print("✅ Scheduler stopped")
+
+
+if __name__ == "__main__":
+    main()
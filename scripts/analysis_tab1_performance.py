@@ -1,65 +1,81 @@
-import pandas as pd
 import os
+import sys
 
-# Load and clean data
-df = pd.read_csv("outputs/final_cleaned_data.csv")
-df['Date'] = pd.to_datetime(df['Date'])
+import pandas as pd
 
-# Drop rows with missing values in key columns
-df = df.dropna(subset=['Super Sector', 'Sector', 'Firm', 'Close'])
+# Make the shared tadawul package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tadawul import performance, schema
 
 # ---- Filters ----
-start_date = pd.to_datetime("2020-01-01")
-end_date = pd.to_datetime("2025-05-31")
-
-# Filter only by date (no filtering by Super Sector/firms)
-filtered_df = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-
-# ==== 1. % Price Change Per Firm ====
-firm_pct_change = (
-    filtered_df.sort_values('Date')
-    .groupby(['Firm', 'Sector', 'Super Sector'])
-    .agg(
-        Start_Price=('Close', lambda x: x.iloc[0]),
-        End_Price=('Close', lambda x: x.iloc[-1])
-    )
-    .reset_index()
-)
-
-firm_pct_change['Pct_Change'] = (
-    (firm_pct_change['End_Price'] - firm_pct_change['Start_Price']) /
-    firm_pct_change['Start_Price']
-) * 100
-
-# ==== 2. Sector-Level Summary ====
-sector_summary = (
-    firm_pct_change
-    .groupby('Sector')
-    .agg(
-        Mean_Change=('Pct_Change', 'mean'),
-        Median_Change=('Pct_Change', 'median'),
-        Std_Dev=('Pct_Change', 'std'),
-        Num_Firms=('Pct_Change', 'count')
-    )
-    .reset_index()
-)
-
-# ==== 3. Top & Bottom Movers ====
-top_movers = firm_pct_change.sort_values(by='Pct_Change', ascending=False).head(5)
-bottom_movers = firm_pct_change.sort_values(by='Pct_Change').head(5)
-
-# ==== 4. Price Trend Data ====
-# Use all firms in the filtered data
-selected_firms = firm_pct_change['Firm'].unique().tolist()
-trend_data = filtered_df[filtered_df['Firm'].isin(selected_firms)]
-
-# ==== Save results ====
-os.makedirs("output", exist_ok=True)
-
-firm_pct_change.to_csv("output/company_price_changes.csv", index=False)
-sector_summary.to_csv("output/sector_price_summary.csv", index=False)
-top_movers.to_csv("output/top_movers.csv", index=False)
-bottom_movers.to_csv("output/bottom_movers.csv", index=False)
-trend_data.to_csv("output/price_trend_data.csv", index=False)
-
-print("✅ Analysis complete. Results saved to /output/")
+START_DATE = pd.to_datetime("2020-01-01")
+END_DATE = pd.to_datetime("2025-05-31")
+
+
+def load_data(path="outputs/final_cleaned_data.csv"):
+    # Load and clean data
+    df = pd.read_csv(path)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def build_outputs(df, start_date=START_DATE, end_date=END_DATE):
+    """Return {output file name: DataFrame} for the dashboard's Tab 1."""
+    # Drop rows with missing values in key columns
+    df = df.dropna(subset=['Super Sector', 'Sector', 'Firm', 'Close'])
+
+    # Filter only by date (no filtering by Super Sector/firms)
+    filtered_df = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
+
+    # ==== 1. % Price Change Per Firm ====
+    # First/last Close per firm via binary searches instead of per-group lambdas
+    firm_pct_change = performance.PerformanceIndex(filtered_df).price_changes(start_date, end_date)
+
+    # ==== 2. Sector-Level Summary ====
+    sector_summary = performance.sector_summary(firm_pct_change)
+
+    # ==== 3. Top & Bottom Movers ====
+    top_movers = performance.movers(firm_pct_change, 5, top=True)
+    bottom_movers = performance.movers(firm_pct_change, 5, top=False)
+
+    # ==== 4. Price Trend Data ====
+    # Use all firms in the filtered data
+    selected_firms = firm_pct_change['Firm'].unique().tolist()
+    trend_data = filtered_df[filtered_df['Firm'].isin(selected_firms)]
+
+    outputs = {
+        "company_price_changes.csv": firm_pct_change,
+        "sector_price_summary.csv": sector_summary,
+        "top_movers.csv": top_movers,
+        "bottom_movers.csv": bottom_movers,
+        # Canonical columns and dtypes only; the pipeline's helper columns are dropped
+        "price_trend_data.csv": schema.apply_schema(trend_data),
+    }
+
+    # ==== 5. Daily Rollups per Aggregation Level ====
+    # Sum and count (not just the mean) so the dashboard can re-derive averages
+    # for any date window without touching the firm-level rows
+    for level, name in [("Super Sector", "super_sector"), ("Sector", "sector")]:
+        outputs[f"rollup_{name}.csv"] = (
+            trend_data
+            .groupby(['Date', level])
+            .agg(Close_Sum=('Close', 'sum'), Close_Count=('Close', 'count'))
+            .reset_index()
+            .sort_values(['Date', level])
+        )
+    return outputs
+
+
+def save_outputs(outputs, out_dir="output"):
+    os.makedirs(out_dir, exist_ok=True)
+    for name, frame in outputs.items():
+        frame.to_csv(os.path.join(out_dir, name), index=False)
+
+
+def main():
+    save_outputs(build_outputs(load_data()))
+    print("✅ Analysis complete. Results saved to /output/")
+
+
+if __name__ == '__main__':
+    main()
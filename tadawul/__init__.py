@@ -0,0 +1 @@
+"""Shared data code for the Saudi stock market dashboard pipeline."""
@@ -0,0 +1,75 @@
+"""Sector / Firm name fixes for the combined price data.
+
+The names only vary per firm, so each fix runs once per unique
+(Sector, Firm) pair and the result is broadcast back to every row through
+the pair's group code. Cleaning cost scales with the number of firms, not
+with the length of the price history.
+"""
+import numpy as np
+
+# Known bad "Sector,Firm" prefixes left by splitting file names on commas
+FIX_MAP = {
+    'Food,& Beverages': 'Food & Beverages',
+    'Capital,Goods': 'Capital Goods',
+    'Commercial,& Professional': 'Commercial & Professional',
+    'Consumer,Durables & Apparel': 'Consumer Durables & Apparel',
+    'Consumer,Services': 'Consumer Services',
+    'Media,and Entertainment': 'Media and Entertainment',
+    'Consumer,Discretionary Distribution & Retail': 'Consumer Discretionary Distribution & Retail',
+    'Consumer,Staples Distribution & Retail': 'Consumer Staples Distribution & Retail',
+    'Household,& Personal Products': 'Household & Personal Products',
+    'Health,Care Equipment & Svc': 'Health Care Equipment & Svc',
+    'Pharma,Biotech & Life Science': 'Pharma Biotech & Life Science',
+    'Financial,Services': 'Financial Services',
+    'Software,& Services': 'Software & Services',
+    'Telecommunication,Services': 'Telecommunication Services',
+}
+
+
+def fix_split_names(sector, firm):
+    """Re-split a Sector/Firm pair whose words were joined by underscores."""
+    combined = f"{sector},{firm}"
+    # Remove extra spaces around comma, and fix & spacing
+    combined = combined.replace(" ,", ",").replace(", ", ",")
+    combined = combined.replace("&_", "& ").replace("_", " ").strip()
+
+    if "_" in combined:
+        # fallback if still bad
+        return sector, firm
+
+    parts = combined.split(",", 1)
+    if len(parts) == 2:
+        return parts[0].strip(), parts[1].strip()
+    return sector, firm
+
+
+def fix_misplaced_commas(sector, firm):
+    """Move words that landed on the wrong side of the Sector,Firm comma."""
+    combo = f"{sector},{firm}"
+    for wrong, fixed in FIX_MAP.items():
+        if combo.startswith(wrong):
+            return fixed, combo[len(wrong) + 1:].strip()
+    return sector, firm
+
+
+def apply_pair_fix(df, fix):
+    """Apply ``fix(sector, firm) -> (sector, firm)`` once per unique pair, in place."""
+    keys = df[["Sector", "Firm"]]
+    codes = keys.groupby(["Sector", "Firm"], sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    pairs = keys.drop_duplicates()
+
+    fixed = [fix(sector, firm) for sector, firm in zip(pairs["Sector"], pairs["Firm"])]
+    new_sectors = np.array([sector for sector, _ in fixed], dtype=object)
+    new_firms = np.array([firm for _, firm in fixed], dtype=object)
+
+    df["Sector"] = new_sectors[codes]
+    df["Firm"] = new_firms[codes]
+    return df
+
+
+def clean_sector_firm(df):
+    """Run the full name cleaning stage on the combined data, in place."""
+    apply_pair_fix(df, fix_split_names)
+    df.rename(columns={"Industry": "Super Sector"}, inplace=True)
+    apply_pair_fix(df, fix_misplaced_commas)
+    return df
@@ -0,0 +1,246 @@
+"""Incremental correlation matrices over daily return series.
+
+:class:`StreamingCorrelation` keeps, for every pair of series (i, j), the
+number of days both were observed, the pairwise mean of i, its sum of
+squared deviations and the co-moment with j. That reproduces pandas'
+pairwise-complete ``DataFrame.corr()`` but can be updated:
+
+* a batch of days is summarised with a few matrix products and merged
+  into the running state with Chan's parallel formulas;
+* appending a single day is an O(k^2) Welford update;
+* with ``window`` set, the oldest day is removed as each new one arrives,
+  giving rolling-window correlations without recomputing the window.
+
+States are saved as ``.npz`` files so the pipeline only feeds new trading
+days on each run.
+"""
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+STATE_DIR = "outputs/correlation_state"
+LEVELS = {"sector": "Sector", "super_sector": "Super Sector", "firm": "Firm"}
+ROLLING_WINDOWS = (60, 120)
+
+
+def daily_matrix(df, column, value="% Change"):
+    """Days x groups matrix of the daily mean ``value`` per ``column``."""
+    df = df.dropna(subset=[value])
+    return df.groupby(["Date", column], observed=True)[value].mean().unstack().sort_index()
+
+
+def _batch_stats(values):
+    """Pairwise (n, mean, M2, C) matrices of a days x k array with NaNs."""
+    mask = ~np.isnan(values)
+    m = mask.astype(float)
+    # Center each column first so the sums of squares stay well conditioned
+    counts = mask.sum(axis=0)
+    center = np.where(mask, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    x = np.where(mask, values - center, 0.0)
+
+    n = m.T @ m
+    sx = x.T @ m           # sum of x_i over days where j is present
+    sxx = (x * x).T @ m
+    sxy = x.T @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n > 0, sx / n, 0.0)
+    m2 = sxx - mean * sx
+    comoment = sxy - mean * sx.T
+    return n, mean + center[:, None], m2, comoment
+
+
+class StreamingCorrelation:
+    def __init__(self, labels, window=None):
+        self.labels = list(labels)
+        self.window = window
+        k = len(self.labels)
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.comoment = np.zeros((k, k))
+        self.last_date = None
+        self.days = 0
+        self.buffer = deque()
+
+    # ---- Growing the label set ----
+    def add_labels(self, labels):
+        new = [label for label in labels if label not in self.labels]
+        if not new:
+            return
+        k, extra = len(self.labels), len(new)
+        for name in ("n", "mean", "m2", "comoment"):
+            grown = np.zeros((k + extra, k + extra))
+            grown[:k, :k] = getattr(self, name)
+            setattr(self, name, grown)
+        self.labels += new
+        self.buffer = deque(np.concatenate([row, np.full(extra, np.nan)]) for row in self.buffer)
+
+    def _align(self, frame):
+        self.add_labels(frame.columns)
+        return frame.reindex(columns=self.labels).to_numpy(dtype=float)
+
+    # ---- Updates ----
+    def _merge(self, n_b, mean_b, m2_b, c_b):
+        n_a, mean_a = self.n, self.mean
+        n = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(n > 0, n_a * n_b / n, 0.0)
+            delta = mean_b - mean_a
+            self.mean = np.where(n > 0, mean_a + delta * np.where(n > 0, n_b / n, 0.0), 0.0)
+        self.m2 = self.m2 + m2_b + delta * delta * weight
+        self.comoment = self.comoment + c_b + delta * delta.T * weight
+        self.n = n
+
+    def _add_row(self, row, sign=1.0):
+        present = ~np.isnan(row)
+        pair = np.outer(present, present).astype(float)
+        x = np.where(present, row, 0.0)[:, None]
+        y = x.T
+        n_old = self.n
+        n_new = n_old + sign * pair
+        mean_old = self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if sign > 0:
+                mean_new = mean_old + pair * (x - mean_old) / np.where(n_new > 0, n_new, 1.0)
+            else:
+                mean_new = np.where(n_new > 0, (n_old * mean_old - pair * x) / np.where(n_new > 0, n_new, 1.0), 0.0)
+        # Welford: M2 += (x - mean_old)(x - mean_new), C += (x - mean_x_new)(y - mean_y_old)
+        if sign > 0:
+            self.m2 = self.m2 + pair * (x - mean_old) * (x - mean_new)
+            self.comoment = self.comoment + pair * (x - mean_new) * (y - mean_old.T)
+        else:
+            self.m2 = self.m2 - pair * (x - mean_new) * (x - mean_old)
+            self.comoment = self.comoment - pair * (x - mean_old) * (y - mean_new.T)
+        self.n = n_new
+        self.mean = np.where(n_new > 0, mean_new, 0.0)
+        self.m2 = np.where(n_new > 0, self.m2, 0.0)
+        self.comoment = np.where(n_new > 0, self.comoment, 0.0)
+
+    def update(self, frame):
+        """Feed a Date-indexed days x labels frame of new observations."""
+        if frame.empty:
+            return self
+        values = self._align(frame)
+        if self.window is None:
+            if len(values) == 1:
+                self._add_row(values[0])
+            else:
+                self._merge(*_batch_stats(values))
+        elif len(values) >= self.window:
+            # The window ends up holding only the new days; summarise them directly
+            k = len(self.labels)
+            self.n, self.mean, self.m2, self.comoment = (np.zeros((k, k)) for _ in range(4))
+            tail = values[-self.window:]
+            self._merge(*_batch_stats(tail))
+            self.buffer = deque(tail)
+        else:
+            for row in values:
+                self._add_row(row)
+                self.buffer.append(row)
+                if len(self.buffer) > self.window:
+                    self._add_row(self.buffer.popleft(), sign=-1.0)
+        self.days += len(values)
+        self.last_date = pd.Timestamp(frame.index.max())
+        return self
+
+    # ---- Results ----
+    def corr(self, min_periods=2):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            denom = np.sqrt(self.m2 * self.m2.T)
+            result = np.where((self.n >= min_periods) & (denom > 0), self.comoment / denom, np.nan)
+        result = np.clip(result, -1.0, 1.0)
+        # Match pandas: a series with any variance correlates 1.0 with itself
+        diagonal = np.diag(self.m2) > 0
+        result[np.diag_indices_from(result)] = np.where(diagonal, 1.0, np.nan)
+        return pd.DataFrame(result, index=self.labels, columns=self.labels)
+
+    # ---- Persistence ----
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            labels=np.array(self.labels, dtype=str),
+            window=np.array(-1 if self.window is None else self.window),
+            n=self.n, mean=self.mean, m2=self.m2, comoment=self.comoment,
+            last_date=np.array(str(self.last_date) if self.last_date is not None else ""),
+            days=np.array(self.days),
+            buffer=np.array(list(self.buffer)) if self.buffer else np.empty((0, len(self.labels))),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            window = int(data["window"])
+            state = cls(data["labels"].tolist(), window=None if window < 0 else window)
+            state.n, state.mean = data["n"], data["mean"]
+            state.m2, state.comoment = data["m2"], data["comoment"]
+            last_date = str(data["last_date"])
+            state.last_date = pd.Timestamp(last_date) if last_date else None
+            state.days = int(data["days"])
+            state.buffer = deque(data["buffer"])
+        return state
+
+
+def state_path(level, window=None, state_dir=STATE_DIR):
+    suffix = "" if window is None else f"_{window}d"
+    return os.path.join(state_dir, f"{level}{suffix}.npz")
+
+
+def update_states(df, levels=LEVELS, windows=ROLLING_WINDOWS, state_dir=STATE_DIR, full=False):
+    """Bring every saved correlation state up to date with ``df``.
+
+    Only days after a state's ``last_date`` are fed in. A state is rebuilt
+    from scratch if it is missing, ``full`` is set, or the history before
+    its ``last_date`` no longer has the same number of days (e.g. after a
+    re-scrape revised past data). Returns {(level, window): state}.
+    """
+    states = {}
+    for level, column in levels.items():
+        matrix = daily_matrix(df, column)
+        for window in (None, *windows):
+            path = state_path(level, window, state_dir)
+            state = None
+            if not full and os.path.exists(path):
+                state = StreamingCorrelation.load(path)
+                seen = (matrix.index <= state.last_date).sum() if state.last_date is not None else 0
+                if seen == 0 or seen != state.days:
+                    state = None
+            if state is None:
+                state = StreamingCorrelation([], window=window)
+                new_days = matrix
+            else:
+                new_days = matrix[matrix.index > state.last_date]
+            states[(level, window)] = state.update(new_days)
+    return states
+
+
+def save_states(states, state_dir=STATE_DIR):
+    os.makedirs(state_dir, exist_ok=True)
+    for (level, window), state in states.items():
+        state.save(state_path(level, window, state_dir))
+
+
+def load_correlation(level, window=None, state_dir=STATE_DIR):
+    """Saved correlation matrix for a level ("sector", "super_sector", "firm")."""
+    return StreamingCorrelation.load(state_path(level, window, state_dir)).corr()
+
+
+def cluster_order(corr):
+    """Positions that put strongly correlated series next to each other.
+
+    Each series is placed by its angle in the plane of the matrix's two
+    leading eigenvectors, a cheap seriation that needs no clustering
+    library and stays fast for the ~270 x 270 firm matrix.
+    """
+    values = np.nan_to_num(np.asarray(corr, dtype=float))
+    if len(values) < 3:
+        return np.arange(len(values))
+    _, vectors = np.linalg.eigh(values)
+    angle = np.arctan2(vectors[:, -2], vectors[:, -1])
+    # eigh's sign is arbitrary; fix it so the order is stable across runs
+    if vectors[:, -1].sum() < 0:
+        angle = np.arctan2(-vectors[:, -2], -vectors[:, -1])
+    return np.argsort(angle, kind="stable")
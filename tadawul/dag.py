@@ -0,0 +1,243 @@
+"""A small dependency-graph runner for the analysis pipeline.
+
+Stages pass their results to dependants in memory and persist only their
+final artifacts. Each stage gets a key built from its code, its input
+files and its dependencies' keys. A stage's code is the file defining its
+functions plus the modules listed in its ``code`` and every project module
+those import, so editing the module that does the work, not just the thin
+wrapper the stage calls, makes the stage stale. A stage whose key matches
+the last successful run and whose artifacts still exist is skipped.
+Independent stages run concurrently in a thread pool.
+"""
+import hashlib
+import inspect
+import json
+import os
+import sys
+import sysconfig
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Stage:
+    """One pipeline step.
+
+    ``func`` is called with the results of ``deps`` (in order) and returns
+    the stage's in-memory result. ``save``, if given, is called with that
+    result to persist the stage's ``outputs``. ``code`` lists the modules
+    that do the stage's work, whose source is part of its key.
+    """
+
+    def __init__(self, name, func, deps=(), inputs=(), outputs=(), save=None, code=()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.save = save
+        self.code = list(code)
+
+
+def path_fingerprint(path):
+    """Cheap fingerprint of a file or directory tree from names, sizes and mtimes."""
+    h = hashlib.sha1()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                h.update(f"{os.path.relpath(os.path.join(root, name), path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    elif os.path.exists(path):
+        stat = os.stat(path)
+        h.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    else:
+        h.update(b"missing")
+    return h.hexdigest()
+
+
+def _code_fingerprint(func):
+    # The whole defining module, so edits to helpers also invalidate the stage
+    try:
+        with open(inspect.getsourcefile(func), "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (TypeError, OSError):
+        return func.__qualname__
+
+
+# The standard library and installed packages are not part of a stage's code
+_LIBRARY_DIRS = tuple(os.path.realpath(path) + os.sep for path in {
+    sysconfig.get_paths()[name] for name in ("stdlib", "platstdlib", "purelib", "platlib")})
+
+
+def _project_file(module):
+    path = getattr(module, "__file__", None)
+    if not path or not path.endswith(".py"):
+        return None
+    path = os.path.realpath(path)
+    return None if path.startswith(_LIBRARY_DIRS) else path
+
+
+def code_files(modules):
+    """Source files of ``modules`` and of every project module they import, sorted."""
+    files, seen = set(), set()
+    stack = list(modules)
+    while stack:
+        module = stack.pop()
+        path = _project_file(module)
+        if path is None or path in seen:
+            continue
+        seen.add(path)
+        files.add(path)
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType):
+                stack.append(value)
+            elif inspect.isfunction(value) or inspect.isclass(value):
+                # from module import name
+                stack.append(sys.modules.get(value.__module__))
+    return sorted(files)
+
+
+def _modules_fingerprint(modules):
+    h = hashlib.sha1()
+    for path in code_files(modules):
+        with open(path, "rb") as f:
+            # Contents only, so moving the checkout does not rerun everything
+            h.update(hashlib.sha1(f.read()).digest())
+    return h.hexdigest()
+
+
+class Pipeline:
+    def __init__(self, stages, state_path):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage {name!r}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {name!r} depends on unknown stage {dep!r}")
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _keys(self):
+        keys = {}
+        for name in self.order:
+            stage = self.stages[name]
+            h = hashlib.sha1(_code_fingerprint(stage.func).encode())
+            if stage.save is not None:
+                h.update(_code_fingerprint(stage.save).encode())
+            if stage.code:
+                h.update(_modules_fingerprint(stage.code).encode())
+            for path in stage.inputs:
+                h.update(path_fingerprint(path).encode())
+            for dep in stage.deps:
+                h.update(keys[dep].encode())
+            keys[name] = h.hexdigest()
+        return keys
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def plan(self, force=False):
+        """Return the set of stage names that have to run."""
+        keys = self._keys()
+        previous = self._load_state().get("keys", {})
+        stale = {
+            name for name in self.order
+            if force
+            or previous.get(name) != keys[name]
+            or not all(os.path.exists(path) for path in self.stages[name].outputs)
+        }
+        # Stale stages need their dependencies' results in memory
+        needed = set()
+
+        def require(name):
+            if name not in needed:
+                needed.add(name)
+                for dep in self.stages[name].deps:
+                    require(dep)
+
+        for name in stale:
+            require(name)
+        return needed, keys
+
+    def run(self, force=False, workers=4):
+        """Run the stale part of the graph; return a list of per-stage timings."""
+        needed, keys = self.plan(force)
+        state = self._load_state()
+        state.setdefault("keys", {})
+        results, report = {}, []
+        pending = [name for name in self.order if name in needed]
+        for name in self.order:
+            if name not in needed:
+                report.append({"stage": name, "status": "skipped", "seconds": 0.0})
+
+        def execute(name):
+            stage = self.stages[name]
+            started = time.perf_counter()
+            result = stage.func(*(results[dep] for dep in stage.deps))
+            computed = time.perf_counter() - started
+            if stage.save is not None:
+                stage.save(result)
+            return result, computed, time.perf_counter() - started - computed
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while pending or running:
+                for name in list(pending):
+                    if all(dep in results for dep in self.stages[name].deps):
+                        pending.remove(name)
+                        running[pool.submit(execute, name)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    result, computed, saved = future.result()
+                    results[name] = result
+                    state["keys"][name] = keys[name]
+                    report.append({
+                        "stage": name,
+                        "status": "ran",
+                        "seconds": round(computed + saved, 3),
+                        "compute_seconds": round(computed, 3),
+                        "save_seconds": round(saved, 3),
+                    })
+                    # Record progress so a failure later on keeps finished stages
+                    self._save_state(state)
+
+        report.sort(key=lambda row: self.order.index(row["stage"]))
+        state["last_run"] = {"finished": time.time(), "stages": report}
+        self._save_state(state)
+        return report
+
+
+def format_report(report):
+    width = max(len(row["stage"]) for row in report)
+    lines = [f"{'Stage':<{width}}  {'Status':<7}  Seconds"]
+    for row in report:
+        lines.append(f"{row['stage']:<{width}}  {row['status']:<7}  {row['seconds']:>7.2f}")
+    lines.append(f"{'Total':<{width}}  {'':<7}  {sum(row['seconds'] for row in report):>7.2f}")
+    return "\n".join(lines)
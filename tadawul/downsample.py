@@ -0,0 +1,48 @@
+"""Min/max bucket downsampling of line series for plotting.
+
+A line chart cannot show more than a couple of points per horizontal
+pixel, so each series is cut into ``buckets`` runs of consecutive rows and
+only the rows holding each run's minimum and maximum (plus the series'
+first and last row) are kept. Peaks and troughs survive, and the number of
+points per series no longer grows with the length of the history.
+
+Like tadawul/risk.py this works on a frame sorted by (series, x), so all
+series are thinned at once with reduceat over the block boundaries.
+"""
+import numpy as np
+
+from tadawul.risk import group_ids
+
+
+def minmax_positions(keys, values, buckets):
+    """Sorted row positions to keep, at most ``2 * buckets + 2`` per series.
+
+    ``keys`` identifies the series and must be contiguous; ``values`` is the
+    plotted y. Series that already fit the budget are kept whole.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    ids, starts = group_ids(keys)
+    stops = np.append(starts[1:], n)
+    sizes = stops - starts
+
+    # Bucket number of every row inside its own series
+    width = np.maximum(np.ceil(sizes / buckets), 1).astype(np.int64)
+    position = np.arange(n) - starts[ids]
+    bucket = ids.astype(np.int64) * (buckets + 1) + position // width[ids]
+    bucket_starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    bucket_ids = np.cumsum(np.concatenate(([0], np.diff(bucket) != 0)))
+
+    # First row reaching each bucket's min and max; NaN rows are never kept
+    keep = []
+    for reduce in (np.fmin, np.fmax):
+        extreme = reduce.reduceat(values, bucket_starts)
+        hits = np.flatnonzero(values == extreme[bucket_ids])
+        first = np.concatenate(([True], bucket_ids[hits][1:] != bucket_ids[hits][:-1]))
+        keep.append(hits[first])
+
+    small = sizes <= 2 * buckets + 2
+    keep += [starts, stops - 1, np.flatnonzero(small[ids])]
+    return np.unique(np.concatenate(keep))
@@ -0,0 +1,161 @@
+"""Vectorized technical indicators for every firm at once.
+
+Like tadawul/risk.py this works on flat arrays of a frame sorted by
+(Firm, Date), where each firm is a contiguous block. Moving averages are
+cumulative sums with a fix-up at the block boundaries. Exponential
+averages are a recurrence, so each block is cut into segments short
+enough that the closed form of the recurrence (a weighted cumulative sum)
+stays exact in float64; the segments are laid out as rows of a 2-D array
+and only the carry from one segment to the next is a (short) Python loop,
+over segment positions rather than firms or rows.
+
+:func:`compute` gives all indicators of all firms in one pass, aligned
+with the input rows, for the dashboard to cache per data version and
+slice per firm.
+"""
+import numpy as np
+
+from tadawul.risk import group_ids, rolling_std
+
+SMA_WINDOWS = (20, 50)
+EMA_SPANS = (20,)
+BOLLINGER_WINDOW = 20
+BOLLINGER_WIDTH = 2
+RSI_WINDOW = 14
+MACD_SPANS = (12, 26, 9)  # fast, slow, signal
+VOLUME_WINDOW = 20
+# Largest log-weight inside an EMA segment; e**10 leaves ~12 exact digits
+MAX_LOG_WEIGHT = 10.0
+
+
+def rolling_mean(values, ids, starts, window):
+    """Mean over the last ``window`` rows of each block.
+
+    Matches ``groupby().rolling(window).mean()``: the result is NaN until a
+    block has ``window`` non-NaN values in the window.
+    """
+    if len(values) == 0:
+        return np.empty(0)
+    valid = ~np.isnan(values)
+    c1 = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    cn = np.concatenate(([0], np.cumsum(valid)))
+
+    idx = np.arange(len(values))
+    lo = np.maximum(idx - window + 1, starts[ids])
+    n = cn[idx + 1] - cn[lo]
+    s1 = c1[idx + 1] - c1[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n >= window, s1 / n, np.nan)
+
+
+def ema(values, starts, alpha):
+    """Exponential moving average within each block, seeded with its first value.
+
+    Matches ``groupby().ewm(alpha=alpha, adjust=False).mean()`` for values
+    without NaN.
+    """
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    decay = 1.0 - alpha
+    # Within a segment y[j] = decay**(j+1) * y[-1] + alpha * decay**j * cumsum(x / decay**j)[j]
+    length = 1 if decay <= 0 else max(1, int(MAX_LOG_WEIGHT / -np.log(decay)))
+    stops = np.append(starts[1:], n)
+    counts = -(-(stops - starts) // length)
+    block = np.repeat(np.arange(len(starts)), counts)
+    position = np.arange(len(block)) - np.repeat(np.cumsum(counts) - counts, counts)
+    seg_starts = starts[block] + position * length
+    sizes = np.minimum(length, stops[block] - seg_starts)
+
+    j = np.arange(length)
+    filled = j < sizes[:, None]
+    grid = np.zeros((len(block), length))
+    # Segments tile the rows in order, so the row-major fill is the rows themselves
+    grid[filled] = values
+    powers = decay ** j
+    partial = alpha * powers * np.cumsum(grid / powers, axis=1)
+
+    # Value before each segment: the block's first value, else the previous segment's last
+    carry = np.empty(len(block))
+    first = position == 0
+    carry[first] = values[seg_starts[first]]
+    last = partial[np.arange(len(block)), sizes - 1]
+    last_decay = decay ** sizes
+    for p in range(1, counts.max()):
+        seg = np.flatnonzero(position == p)
+        carry[seg] = last_decay[seg - 1] * carry[seg - 1] + last[seg - 1]
+    return (decay * powers * carry[:, None] + partial)[filled]
+
+
+def span_alpha(span):
+    """Smoothing factor of an EMA over ``span`` rows (pandas' ``span=``)."""
+    return 2.0 / (span + 1)
+
+
+def rsi(close, ids, starts, window=RSI_WINDOW):
+    """Wilder's relative strength index (0-100) within each block.
+
+    Gains and losses are smoothed with alpha = 1 / ``window`` from each
+    block's first change; the first ``window`` rows of a block are NaN. A
+    window without any change reads 50.
+    """
+    n = len(close)
+    out = np.full(n, np.nan)
+    if n == 0:
+        return out
+    # The changes of a block start on its second row
+    changed = np.ones(n, dtype=bool)
+    changed[starts] = False
+    change = np.diff(close, prepend=np.nan)[changed]
+    _, change_starts = group_ids(ids[changed])
+    gain = ema(np.maximum(change, 0.0), change_starts, 1.0 / window)
+    loss = ema(np.maximum(-change, 0.0), change_starts, 1.0 / window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        value = np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+    out[changed] = value
+    out[np.arange(n) - starts[ids] < window] = np.nan
+    return out
+
+
+def macd(close, starts, spans=MACD_SPANS):
+    """(MACD line, signal line, histogram) within each block."""
+    fast, slow, signal = spans
+    line = ema(close, starts, span_alpha(fast)) - ema(close, starts, span_alpha(slow))
+    trigger = ema(line, starts, span_alpha(signal))
+    return line, trigger, line - trigger
+
+
+def bollinger(close, ids, starts, window=BOLLINGER_WINDOW, width=BOLLINGER_WIDTH):
+    """(middle, upper, lower) bands: the rolling mean +/- ``width`` sample stds."""
+    middle = rolling_mean(close, ids, starts, window)
+    spread = width * rolling_std(close, ids, starts, window)
+    return middle, middle + spread, middle - spread
+
+
+def compute(df):
+    """Every indicator of every firm, one row per row of ``df``.
+
+    ``df`` must be sorted by (Firm, Date) with no missing Close; Volume is
+    optional. Returns Date, Firm, Close (and Volume) plus one float32
+    column per indicator, in the same row order.
+    """
+    firms = df["Firm"].to_numpy()
+    close = df["Close"].to_numpy(dtype=float)
+    ids, starts = group_ids(firms)
+    series = {}
+    for window in SMA_WINDOWS:
+        series[f"SMA_{window}"] = rolling_mean(close, ids, starts, window)
+    for span in EMA_SPANS:
+        series[f"EMA_{span}"] = ema(close, starts, span_alpha(span))
+    _, series["BB_Upper"], series["BB_Lower"] = bollinger(close, ids, starts)
+    series[f"RSI_{RSI_WINDOW}"] = rsi(close, ids, starts)
+    series["MACD"], series["MACD_Signal"], series["MACD_Hist"] = macd(close, starts)
+    if "Volume" in df.columns:
+        volume = df["Volume"].to_numpy(dtype=float, na_value=np.nan)
+        series[f"Volume_SMA_{VOLUME_WINDOW}"] = rolling_mean(volume, ids, starts, VOLUME_WINDOW)
+
+    base = [col for col in ("Date", "Firm", "Close", "Volume") if col in df.columns]
+    out = df[base].reset_index(drop=True)
+    for name, values in series.items():
+        out[name] = values.astype(np.float32)
+    return out
@@ -0,0 +1,266 @@
+"""Incremental ingest of data/historical_data into a Parquet price store.
+
+Each scraped ``<Sector>_<Firm>.csv`` becomes one Parquet partition holding
+that firm's rows sorted by Date, so the store is keyed by (Firm, Date).
+A manifest remembers the size, mtime and hash of every source file and a
+re-run only re-parses the files that actually changed.
+
+The scraper (tadawul/scraper.py) appends straight to the store with
+:func:`append_rows`, typing the table cells once as they are captured.
+Those partitions are marked as scraped in the manifest and from then on
+take precedence over any CSV of the same firm.
+
+Usage (from the repository root):
+
+    python -m tadawul.ingest
+    python -m tadawul.ingest --export-csv outputs/cleaned_combined_with_industry.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from tadawul.sectors import split_file_stem
+
+SOURCE_DIR = "data/historical_data"
+STORE_DIR = "outputs/price_store"
+MANIFEST_NAME = "manifest.json"
+
+# The scraper writes the table cells under headers "0".."9" (or "0".."12")
+RAW_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Change", "% Change", "Volume"]
+RAW_HEADERS = [str(i) for i in range(len(RAW_COLUMNS))]
+NUMERIC_COLUMNS = RAW_COLUMNS[1:]
+SCRAPED = "scraper"
+
+# Scraper workers append from several threads; they share the manifest
+_manifest_lock = threading.Lock()
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _typed(df, stem):
+    """Type raw table cells (columns RAW_COLUMNS, all strings) for one firm."""
+    sector, super_sector, firm = split_file_stem(stem)
+
+    # "No data available in table" and blank rows have no valid date
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d", errors="coerce")
+    df = df.dropna(subset=["Date"])
+
+    # Prices and volumes above 999 come quoted with thousands separators
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col].astype(str).str.replace(",", "", regex=False), errors="coerce")
+    df["Volume"] = df["Volume"].round().astype("Int64")
+
+    df = (
+        df.drop_duplicates(subset="Date", keep="first")
+        .sort_values("Date")
+        .reset_index(drop=True)
+    )
+    df["Sector"] = sector
+    df["Super Sector"] = super_sector
+    df["Firm"] = firm
+    return df
+
+
+def parse_firm_file(path):
+    """Parse one scraped CSV into a typed, Date-sorted frame."""
+    df = pd.read_csv(
+        path,
+        header=0,
+        usecols=lambda c: c in RAW_HEADERS,
+        na_values=["-", ""],
+        keep_default_na=False,
+        dtype=str,
+    )
+    # Firms with no trades at all are saved as a single "0" column
+    df = df.reindex(columns=RAW_HEADERS)
+    df.columns = RAW_COLUMNS
+    return _typed(df, os.path.basename(path)[:-len(".csv")])
+
+
+def parse_rows(stem, rows):
+    """Type the cells of scraped table rows, as :func:`parse_firm_file` does."""
+    width = len(RAW_COLUMNS)
+    cells = [list(row[:width]) + [""] * (width - len(row)) for row in rows]
+    df = pd.DataFrame(cells, columns=RAW_COLUMNS, dtype=str)
+    return _typed(df.replace({"-": None, "": None}), stem)
+
+
+def _write_frame(df, target):
+    tmp = target + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+
+
+def _write_partition(path, store_dir):
+    stem = os.path.basename(path)[:-len(".csv")]
+    df = parse_firm_file(path)
+    _write_frame(df, os.path.join(store_dir, stem + ".parquet"))
+    return stem, len(df)
+
+
+def _load_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(store_dir, manifest):
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def ingest(source_dir=SOURCE_DIR, store_dir=STORE_DIR, workers=None, full=False):
+    """Bring the price store up to date with ``source_dir``.
+
+    Returns a dict with the lists of parsed, unchanged and removed file stems.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = _load_manifest(store_dir)
+    if full:
+        # Scraped partitions have no source file to rebuild them from
+        manifest = {stem: entry for stem, entry in manifest.items() if entry.get("source") == SCRAPED}
+
+    sources = {
+        name[:-len(".csv")]: os.path.join(source_dir, name)
+        for name in sorted(os.listdir(source_dir))
+        if name.endswith(".csv")
+    }
+
+    changed, unchanged = [], []
+    for stem, path in sources.items():
+        st = os.stat(path)
+        entry = manifest.get(stem)
+        partition = os.path.join(store_dir, stem + ".parquet")
+        if entry and entry.get("source") == SCRAPED:
+            unchanged.append(stem)
+            continue
+        if entry and os.path.exists(partition):
+            if entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+                unchanged.append(stem)
+                continue
+            # Touched but identical content (e.g. a fresh git checkout)
+            digest = file_digest(path)
+            if entry["sha1"] == digest:
+                entry["mtime"] = st.st_mtime
+                unchanged.append(stem)
+                continue
+        changed.append(stem)
+
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(
+                _write_partition,
+                [sources[stem] for stem in changed],
+                [store_dir] * len(changed),
+            )
+            for stem, n_rows in results:
+                st = os.stat(sources[stem])
+                manifest[stem] = {
+                    "size": st.st_size,
+                    "mtime": st.st_mtime,
+                    "sha1": file_digest(sources[stem]),
+                    "rows": n_rows,
+                }
+
+    removed = [stem for stem, entry in manifest.items()
+               if stem not in sources and entry.get("source") != SCRAPED]
+    for stem in removed:
+        del manifest[stem]
+        partition = os.path.join(store_dir, stem + ".parquet")
+        if os.path.exists(partition):
+            os.remove(partition)
+
+    _save_manifest(store_dir, manifest)
+    return {"parsed": changed, "unchanged": unchanged, "removed": removed}
+
+
+def append_rows(stem, rows, store_dir=STORE_DIR):
+    """Add scraped table rows to a firm's partition; returns the new row count.
+
+    A re-scraped date replaces the stored row, so the partition stays unique
+    on Date (and the store on (Firm, Date)).
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    target = os.path.join(store_dir, stem + ".parquet")
+    df = parse_rows(stem, rows)
+    if os.path.exists(target):
+        df = (
+            pd.concat([df, pd.read_parquet(target)], ignore_index=True)
+            .drop_duplicates(subset="Date", keep="first")
+            .sort_values("Date")
+            .reset_index(drop=True)
+        )
+    _write_frame(df, target)
+    with _manifest_lock:
+        manifest = _load_manifest(store_dir)
+        manifest[stem] = {"source": SCRAPED, "rows": len(df)}
+        _save_manifest(store_dir, manifest)
+    return len(df)
+
+
+def last_date(stem, store_dir=STORE_DIR):
+    """Last stored date of a firm as YYYY-MM-DD, or None."""
+    target = os.path.join(store_dir, stem + ".parquet")
+    if not os.path.exists(target):
+        return None
+    dates = pd.read_parquet(target, columns=["Date"])["Date"]
+    return None if dates.empty else dates.max().date().isoformat()
+
+
+def load_price_store(store_dir=STORE_DIR, columns=None):
+    """Read the whole store as one frame sorted by (Firm, Date)."""
+    files = sorted(
+        os.path.join(store_dir, name)
+        for name in os.listdir(store_dir)
+        if name.endswith(".parquet")
+    )
+    df = pd.concat(
+        (pd.read_parquet(path, columns=columns) for path in files),
+        ignore_index=True,
+    )
+    if {"Firm", "Date"} <= set(df.columns):
+        df = df.sort_values(["Firm", "Date"], kind="stable").reset_index(drop=True)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest scraped Tadawul CSVs into the Parquet price store.")
+    parser.add_argument("--source", default=SOURCE_DIR)
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-parse every file")
+    parser.add_argument("--export-csv", metavar="PATH",
+                        help="also write the combined store in the cleaned_combined_with_industry.csv layout")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = ingest(args.source, args.store, workers=args.workers, full=args.full)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Ingest done in {elapsed:.2f}s: {len(result['parsed'])} parsed, "
+          f"{len(result['unchanged'])} unchanged, {len(result['removed'])} removed")
+
+    if args.export_csv:
+        combined = load_price_store(args.store).rename(columns={"Super Sector": "Industry"})
+        combined.to_csv(args.export_csv, index=False)
+        print(f"✅ Combined data saved to {args.export_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Price change per firm, sector summary and movers for any date window.
+
+:class:`PerformanceIndex` keeps every firm's Close as one Date-sorted
+block of a flat array. A window's first and last row of all firms is then
+found with two ``searchsorted`` calls on a combined (firm, day) key
+instead of a groupby over the whole history, so a query over all firms is
+cheap enough to run on every move of the dashboard's date slider.
+"""
+import numpy as np
+import pandas as pd
+
+from tadawul.risk import group_ids
+
+CHANGE_COLUMNS = ["Firm", "Sector", "Super Sector", "Start_Price", "End_Price", "Pct_Change"]
+
+
+class PerformanceIndex:
+    def __init__(self, df):
+        df = df.dropna(subset=["Super Sector", "Sector", "Firm", "Close"])
+        df = df.sort_values(["Firm", "Date"], kind="stable")
+        ids, starts = group_ids(df["Firm"].to_numpy())
+        self.firms = pd.DataFrame({
+            column: df[column].to_numpy()[starts] for column in ["Firm", "Sector", "Super Sector"]
+        })
+        self.close = df["Close"].to_numpy(dtype=float)
+
+        days = df["Date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        self.origin = days.min() if len(days) else 0
+        # One spare day each side, so out-of-range queries stay inside a firm's key range
+        self.span = (days.max() - self.origin + 2) if len(days) else 2
+        self.keys = ids.astype(np.int64) * self.span + (days - self.origin)
+        self.block_offsets = np.arange(len(starts), dtype=np.int64) * self.span
+
+    def _day(self, date, default):
+        if date is None:
+            return default
+        day = np.datetime64(pd.Timestamp(date), "D").astype(np.int64) - self.origin
+        return int(np.clip(day, -1, self.span - 1))
+
+    def price_changes(self, start=None, end=None):
+        """First/last Close and % change of every firm with data in [start, end]."""
+        lo = np.searchsorted(self.keys, self.block_offsets + self._day(start, -1), side="left")
+        hi = np.searchsorted(self.keys, self.block_offsets + self._day(end, self.span - 1), side="right") - 1
+        present = lo <= hi
+        changes = self.firms[present].reset_index(drop=True)
+        start_price = self.close[lo[present]]
+        end_price = self.close[hi[present]]
+        changes["Start_Price"] = start_price
+        changes["End_Price"] = end_price
+        with np.errstate(invalid="ignore", divide="ignore"):
+            changes["Pct_Change"] = (end_price - start_price) / start_price * 100
+        return changes
+
+
+def sector_summary(changes):
+    """Mean, median and spread of the firms' % change per Sector."""
+    return (
+        changes
+        .groupby('Sector')
+        .agg(
+            Mean_Change=('Pct_Change', 'mean'),
+            Median_Change=('Pct_Change', 'median'),
+            Std_Dev=('Pct_Change', 'std'),
+            Num_Firms=('Pct_Change', 'count')
+        )
+        .reset_index()
+    )
+
+
+def movers(changes, n=5, top=True):
+    """The ``n`` firms with the largest (or, with top=False, smallest) % change."""
+    values = changes["Pct_Change"].to_numpy()
+    valid = np.flatnonzero(~np.isnan(values))
+    scores = values[valid] if not top else -values[valid]
+    if len(valid) > n:
+        # Only the n best need a full sort
+        picked = np.argpartition(scores, n - 1)[:n]
+    else:
+        picked = np.arange(len(valid))
+    picked = picked[np.argsort(scores[picked], kind="stable")]
+    return changes.iloc[valid[picked]]
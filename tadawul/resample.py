@@ -0,0 +1,109 @@
+"""Weekly and monthly OHLCV bars per firm, and picking a resolution to plot.
+
+Like tadawul/risk.py this works on a frame sorted by (Firm, Date): every
+(firm, week) or (firm, month) bar is then a contiguous run of rows, so all
+bars of all firms come out of one ``reduceat`` per column instead of a
+groupby. Returns are computed within each firm, so a firm's first bar is
+never compared with the previous firm's last one.
+
+Weeks run Sunday to Saturday, which keeps each Sunday-Thursday trading
+week in one bar. A bar's Date is its last trading day.
+"""
+import numpy as np
+import pandas as pd
+
+from tadawul.risk import daily_returns, group_ids
+
+# Finest first; None is the daily table itself
+RESOLUTIONS = {"daily": None, "weekly": "W-SAT", "monthly": "M"}
+NAME_COLUMNS = ["Firm", "Sector", "Super Sector"]
+TRADING_WEEK = "Sun Mon Tue Wed Thu"
+
+
+def _first_valid(values, starts, stops):
+    """First non-NaN value of each run of rows (NaN if there is none)."""
+    valid = np.flatnonzero(~np.isnan(values))
+    if not len(valid):
+        return np.full(len(starts), np.nan)
+    rows = valid[np.minimum(np.searchsorted(valid, starts), len(valid) - 1)]
+    return np.where((rows >= starts) & (rows < stops), values[rows], np.nan)
+
+
+def _last_valid(values, starts, stops):
+    """Last non-NaN value of each run of rows (NaN if there is none)."""
+    valid = np.flatnonzero(~np.isnan(values))
+    if not len(valid):
+        return np.full(len(starts), np.nan)
+    rows = valid[np.maximum(np.searchsorted(valid, stops) - 1, 0)]
+    return np.where((rows >= starts) & (rows < stops), values[rows], np.nan)
+
+
+def bars(df, resolution):
+    """OHLCV bars of every firm at ``resolution`` ("weekly" or "monthly").
+
+    ``df`` must be sorted by (Firm, Date). Open is the first and Close the
+    last price of the bar, High/Low its extremes and Volume its sum, all
+    ignoring missing values; Days counts the trading days in the bar and
+    Return is the Close-to-Close change against the firm's previous bar.
+    """
+    n = len(df)
+    if n == 0:
+        raise ValueError("No rows to resample")
+    firm_ids, _ = group_ids(df["Firm"].to_numpy())
+    periods = pd.PeriodIndex(df["Date"], freq=RESOLUTIONS[resolution]).asi8
+    change = (np.diff(firm_ids) != 0) | (np.diff(periods) != 0)
+    starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+    stops = np.append(starts[1:], n)
+
+    out = {"Date": df["Date"].to_numpy()[stops - 1]}
+    for col in NAME_COLUMNS:
+        if col in df.columns:
+            out[col] = df[col].iloc[starts].reset_index(drop=True)
+
+    def prices(col):
+        return df[col].to_numpy(dtype=float, na_value=np.nan)
+
+    dtype = df["Close"].dtype
+    if "Open" in df.columns:
+        out["Open"] = _first_valid(prices("Open"), starts, stops).astype(dtype)
+    if "High" in df.columns:
+        out["High"] = np.fmax.reduceat(prices("High"), starts).astype(dtype)
+    if "Low" in df.columns:
+        out["Low"] = np.fmin.reduceat(prices("Low"), starts).astype(dtype)
+    close = _last_valid(prices("Close"), starts, stops)
+    out["Close"] = close.astype(dtype)
+    if "Volume" in df.columns:
+        volume = prices("Volume")
+        traded = np.add.reduceat(~np.isnan(volume), starts) > 0
+        totals = np.add.reduceat(np.nan_to_num(volume), starts)
+        out["Volume"] = pd.array(np.where(traded, totals, np.nan), dtype="Int64")
+    out["Days"] = stops - starts
+
+    _, firm_starts = group_ids(firm_ids[starts])
+    out["Return"] = daily_returns(close, firm_starts)
+    return pd.DataFrame(out)
+
+
+def pyramid(df):
+    """{resolution: bars} for every resolution coarser than daily."""
+    return {name: bars(df, name) for name, freq in RESOLUTIONS.items() if freq is not None}
+
+
+def bar_count(start, end, resolution):
+    """Bars one firm trading every day has between two dates (inclusive)."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    freq = RESOLUTIONS[resolution]
+    if freq is None:
+        return int(np.busday_count(start.date(), (end + pd.Timedelta(days=1)).date(), weekmask=TRADING_WEEK))
+    return end.to_period(freq).ordinal - start.to_period(freq).ordinal + 1
+
+
+def pick_resolution(start, end, max_points):
+    """The finest resolution with at most ``max_points`` bars per firm in the range.
+
+    Falls back to the coarsest resolution when even that has more.
+    """
+    for resolution in RESOLUTIONS:
+        if bar_count(start, end, resolution) <= max_points:
+            return resolution
+    return resolution
@@ -0,0 +1,163 @@
+"""Vectorized per-firm risk metrics.
+
+Everything works on flat NumPy arrays of a frame sorted by (Firm, Date):
+each firm is a contiguous block, so per-firm operations become cumulative
+sums and accumulates over the whole array plus a fix-up at the block
+boundaries, instead of a Python loop over ``df.groupby('Firm')``.
+"""
+import numpy as np
+import pandas as pd
+
+VOL_WINDOWS = (20, 30, 60, 252)
+TRADING_DAYS = 252
+
+
+def group_ids(keys):
+    """Return (ids, starts) for a key array where equal keys are contiguous."""
+    if isinstance(keys, pd.Categorical) or isinstance(getattr(keys, "dtype", None), pd.CategoricalDtype):
+        # Integer codes compare much faster than firm name strings
+        keys = pd.Categorical(keys).codes
+    keys = np.asarray(keys)
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    change = keys[1:] != keys[:-1]
+    starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+    ids = np.cumsum(np.concatenate(([0], change))).astype(np.intp)
+    return ids, starts
+
+
+def daily_returns(close, starts):
+    """Simple returns within each block; NaN on each block's first row."""
+    returns = np.empty(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1
+    returns[starts] = np.nan
+    return returns
+
+
+def rolling_std(values, ids, starts, window):
+    """Sample std over the last ``window`` rows of each block.
+
+    Matches ``groupby().rolling(window).std()``: the result is NaN until a
+    block has ``window`` non-NaN values in the window.
+    """
+    if len(values) == 0:
+        return np.empty(0)
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+    # Center per block to keep the sum-of-squares formula numerically stable
+    counts = np.add.reduceat(valid, starts)
+    means = np.add.reduceat(x, starts) / np.maximum(counts, 1)
+    x = np.where(valid, x - means[ids], 0.0)
+
+    c1 = np.concatenate(([0.0], np.cumsum(x)))
+    c2 = np.concatenate(([0.0], np.cumsum(x * x)))
+    cn = np.concatenate(([0], np.cumsum(valid)))
+
+    idx = np.arange(len(values))
+    lo = np.maximum(idx - window + 1, starts[ids])
+    n = cn[idx + 1] - cn[lo]
+    s1 = c1[idx + 1] - c1[lo]
+    s2 = c2[idx + 1] - c2[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (s2 - s1 * s1 / n) / (n - 1)
+    var = np.where(n >= window, np.maximum(var, 0.0), np.nan)
+    return np.sqrt(var)
+
+
+def running_peak(close, ids):
+    """Per-block running maximum, exact (no float offsets)."""
+    uniques, ranks = np.unique(close, return_inverse=True)
+    span = len(uniques)
+    keyed = ranks.astype(np.int64) + ids.astype(np.int64) * span
+    peak_ranks = np.maximum.accumulate(keyed) - ids.astype(np.int64) * span
+    return uniques[peak_ranks]
+
+
+def risk_series(firms, close, windows=VOL_WINDOWS):
+    """Per-row return, rolling volatility, running peak and drawdown.
+
+    ``firms`` and ``close`` must come from a frame sorted by (Firm, Date)
+    with no missing Close. Returns a dict of equally long arrays.
+    """
+    close = np.asarray(close, dtype=float)
+    ids, starts = group_ids(firms)
+    returns = daily_returns(close, starts)
+    series = {"Daily_Return": returns}
+    for window in windows:
+        series[f"Rolling_Volatility_{window}d"] = rolling_std(returns, ids, starts, window)
+    peak = running_peak(close, ids)
+    series["Running_Peak"] = peak
+    series["Drawdown"] = close / peak - 1
+    return series
+
+
+def risk_table(df, series=None, windows=VOL_WINDOWS):
+    """One row per firm: volatility, max drawdown, its dates and durations.
+
+    ``df`` must be sorted by (Firm, Date) and have no missing Close;
+    ``series`` can pass in an already computed :func:`risk_series` result.
+    """
+    firms = df["Firm"].to_numpy()
+    dates = df["Date"].to_numpy()
+    if series is None:
+        series = risk_series(firms, df["Close"].to_numpy(), windows)
+    ids, starts = group_ids(firms)
+    n = len(df)
+    if n == 0:
+        return pd.DataFrame()
+    stops = np.append(starts[1:], n)
+    idx = np.arange(n)
+
+    returns = series["Daily_Return"]
+    drawdown = series["Drawdown"]
+    at_peak = drawdown >= 0
+
+    # Max drawdown and the first row where it is reached
+    max_dd = np.minimum.reduceat(drawdown, starts)
+    hits = np.flatnonzero(drawdown == max_dd[ids])
+    trough = hits[np.concatenate(([True], ids[hits][1:] != ids[hits][:-1]))]
+
+    # Last peak at or before each row; every block starts at a peak
+    last_peak = np.maximum.accumulate(np.where(at_peak, idx, -1))
+    # Next peak at or after each row, or the block's last row if none follows
+    next_peak = np.minimum.accumulate(np.where(at_peak, idx, n)[::-1])[::-1]
+    spell_end = np.minimum(next_peak, stops[ids] - 1)
+
+    peak_at_trough = last_peak[trough]
+    recovery = next_peak[trough]
+    recovered = recovery < stops
+
+    # Underwater spells run from a peak to the next peak (or the last date)
+    day = np.timedelta64(1, "D")
+    drawdown_days = (dates[spell_end[trough]] - dates[peak_at_trough]) / day
+    underwater_days = (dates[spell_end] - dates[last_peak]) / day
+    longest_underwater = np.maximum.reduceat(underwater_days, starts)
+
+    valid = ~np.isnan(returns)
+    counts = np.add.reduceat(valid, starts)
+    sums = np.add.reduceat(np.where(valid, returns, 0.0), starts)
+    mean_return = sums / np.maximum(counts, 1)
+    sq = np.add.reduceat(np.where(valid, (returns - mean_return[ids]) ** 2, 0.0), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std_return = np.where(counts > 1, np.sqrt(sq / (counts - 1)), np.nan)
+
+    table = pd.DataFrame({
+        "Firm": firms[starts],
+        "Start_Date": dates[starts],
+        "End_Date": dates[stops - 1],
+        "Observations": stops - starts,
+        "Mean_Daily_Return": np.where(counts > 0, mean_return, np.nan),
+        "Daily_Volatility": std_return,
+        "Annualized_Volatility": std_return * np.sqrt(TRADING_DAYS),
+    })
+    for window in windows:
+        column = f"Rolling_Volatility_{window}d"
+        if column in series:
+            table[f"Latest_Volatility_{window}d"] = series[column][stops - 1]
+    table["Max_Drawdown"] = max_dd
+    table["Peak_Date"] = dates[peak_at_trough]
+    table["Trough_Date"] = dates[trough]
+    table["Recovery_Date"] = pd.Series(dates[recovery.clip(max=n - 1)]).where(recovered).to_numpy()
+    table["Drawdown_Days"] = drawdown_days
+    table["Longest_Underwater_Days"] = longest_underwater
+    return table
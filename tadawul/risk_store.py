@@ -0,0 +1,64 @@
+"""Firm-partitioned Parquet store of per-firm return and drawdown series.
+
+The file holds one row group per firm, and the firm -> row group map is
+kept in the Parquet schema metadata, so a reader can pull just the
+selected firms' histories without scanning the rest of the file. Being a
+single file, it is replaced atomically.
+"""
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tadawul.risk import group_ids
+
+RISK_SERIES_PATH = "outputs/risk_series.parquet"
+INDEX_KEY = b"firm_row_groups"
+
+
+def series_frame(df, series):
+    """Date/Firm/Close of ``df`` alongside the arrays of risk.risk_series()."""
+    return pd.DataFrame({
+        "Date": df["Date"].to_numpy(),
+        "Firm": df["Firm"].astype(str).to_numpy(),
+        "Close": df["Close"].to_numpy(dtype="float64"),
+        **series,
+    })
+
+
+def write_risk_series(frame, path=RISK_SERIES_PATH):
+    """Persist a :func:`series_frame`, which must be sorted by (Firm, Date)."""
+    _, starts = group_ids(frame["Firm"].to_numpy())
+    stops = list(starts[1:]) + [len(frame)]
+    index = {frame["Firm"].iat[start]: group for group, start in enumerate(starts)}
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    schema = table.schema.with_metadata({
+        **(table.schema.metadata or {}),
+        INDEX_KEY: json.dumps(index).encode(),
+    })
+    table = table.replace_schema_metadata(schema.metadata)
+
+    tmp = path + ".tmp"
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for start, stop in zip(starts, stops):
+            writer.write_table(table.slice(start, stop - start))
+    os.replace(tmp, path)
+
+
+def open_store(path=RISK_SERIES_PATH):
+    """Return (ParquetFile, {firm: row group}) for repeated reads."""
+    parquet_file = pq.ParquetFile(path)
+    index = json.loads(parquet_file.schema_arrow.metadata[INDEX_KEY])
+    return parquet_file, index
+
+
+def read_firms(firms, path=RISK_SERIES_PATH, columns=None, store=None):
+    """Read the series of ``firms`` only, in the order given."""
+    parquet_file, index = store or open_store(path)
+    groups = [index[firm] for firm in firms if firm in index]
+    if not groups:
+        return pd.DataFrame(columns=columns or parquet_file.schema_arrow.names)
+    return parquet_file.read_row_groups(groups, columns=columns).to_pandas()
@@ -0,0 +1,68 @@
+"""Canonical columns and dtypes of the firm-level price history.
+
+The dashboard keeps this table in memory for every Streamlit worker, so it
+is stored compactly: names as categoricals (one copy of each string plus
+small integer codes), prices as float32 and volume as nullable int64.
+Pipeline helper columns (Month, rolling volatility, sector averages) are
+not part of it.
+
+:func:`apply_schema` is used when the pipeline writes the table and
+:func:`read_prices` when the dashboard loads it, with ``columns`` limiting
+the load to what a tab actually uses.
+"""
+import pandas as pd
+
+PRICE_SCHEMA = {
+    "Date": "datetime64[ns]",
+    "Firm": "category",
+    "Sector": "category",
+    "Super Sector": "category",
+    "Open": "float32",
+    "High": "float32",
+    "Low": "float32",
+    "Close": "float32",
+    "Change": "float32",
+    "% Change": "float32",
+    "Volume": "Int64",
+    "Daily_Return": "float32",
+}
+PRICE_COLUMNS = list(PRICE_SCHEMA)
+
+
+def _projection(columns):
+    if columns is None:
+        return PRICE_COLUMNS
+    unknown = [col for col in columns if col not in PRICE_SCHEMA]
+    if unknown:
+        raise ValueError(f"Not in the price schema: {unknown}")
+    # Keep the canonical column order whatever order was asked for
+    return [col for col in PRICE_COLUMNS if col in columns]
+
+
+def apply_schema(df, columns=None):
+    """Project ``df`` onto the canonical columns it has and cast their dtypes."""
+    columns = [col for col in _projection(columns) if col in df.columns]
+    df = df[columns].copy()
+    for col in columns:
+        dtype = PRICE_SCHEMA[col]
+        if dtype.startswith("datetime"):
+            df[col] = pd.to_datetime(df[col]).astype(dtype)
+        elif dtype == "Int64":
+            df[col] = pd.to_numeric(df[col]).round().astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def read_prices(path, columns=None):
+    """Read a price history CSV with only ``columns``, already typed."""
+    columns = _projection(columns)
+    header = pd.read_csv(path, nrows=0).columns
+    columns = [col for col in columns if col in header]
+    dtypes = {col: PRICE_SCHEMA[col] for col in columns
+              if not PRICE_SCHEMA[col].startswith("datetime")}
+    df = pd.read_csv(path, usecols=columns, dtype=dtypes)
+    for col in columns:
+        if col not in dtypes:
+            df[col] = pd.to_datetime(df[col]).astype(PRICE_SCHEMA[col])
+    return df[columns]
@@ -0,0 +1,176 @@
+"""Offline stand-in for the historical reports page, for testing the scraper.
+
+Serves a page with the same element ids and behaviour the scraper relies
+on: the market, sector and entity dropdowns, the read-only period inputs,
+a table filled asynchronously after a selection, and a "pageing_next"
+button that turns ``disabled`` on the last page. Prices are a
+deterministic random walk per firm, formatted like the real site
+(thousands separators, two trailing empty cells).
+
+Usage (from the repository root):
+
+    python -m tadawul.scrape_fixture --port 8765
+    python scripts/scrape_sector_company_list.py --url http://127.0.0.1:8765/ --store /tmp/fixture_store
+"""
+import argparse
+import datetime
+import json
+import random
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_SECTORS = {
+    "Banks": ["Al Rajhi Bank", "Alinma Bank", "Bank Albilad"],
+    "Energy": ["Saudi Arabian Oil Co.", "Arabian Drilling Co."],
+    "Materials": ["Saudi Basic Industries Corp.", "Yanbu Cement Co.", "Saudi Arabian Mining Co."],
+    "Utilities": ["ACWA POWER Co."],
+}
+FIRST_DAY = datetime.date(2020, 1, 1)
+LAST_DAY = datetime.date(2025, 5, 29)
+PAGE_SIZE = 10
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Historical Reports (fixture)</title></head>
+<body>
+<select id="marketOrIndices">
+  <option>Select</option><option>Main Market</option><option>Nomu - Parallel Market</option>
+</select>
+<input id="startTimePeriod" readonly value="">
+<input id="endTimePeriod" readonly value="">
+<select id="sectors"><option>Select Sector</option></select>
+<select id="entity"><option>Select Company</option></select>
+<table>
+  <thead><tr><th>Date</th><th>Open</th><th>High</th><th>Low</th><th>Close</th><th>Change</th>
+  <th>% Change</th><th>Volume Traded</th><th></th><th></th></tr></thead>
+  <tbody><tr><td class="dataTables_empty" colspan="10">No data available in table</td></tr></tbody>
+</table>
+<a id="pageing_next" class="paginate_button next disabled" href="#">Next</a>
+<script>
+const DELAY = __DELAY__;
+const SECTORS = __SECTORS__;
+let rows = [], page = 0;
+const $ = id => document.getElementById(id);
+const later = fn => setTimeout(fn, DELAY);
+
+function render() {
+  const body = document.querySelector("table tbody");
+  const shown = rows.slice(page * __PAGE_SIZE__, (page + 1) * __PAGE_SIZE__);
+  body.innerHTML = shown.length
+    ? shown.map(r => "<tr>" + r.map(c => "<td>" + c + "</td>").join("") + "</tr>").join("")
+    : '<tr><td class="dataTables_empty" colspan="10">No data available in table</td></tr>';
+  const last = (page + 1) * __PAGE_SIZE__ >= rows.length;
+  $("pageing_next").className = "paginate_button next" + (last ? " disabled" : "");
+}
+
+$("marketOrIndices").addEventListener("change", e => later(() => {
+  $("sectors").innerHTML = "<option>Select Sector</option>" +
+    (e.target.value === "Select" ? "" : Object.keys(SECTORS).map(s => "<option>" + s + "</option>").join(""));
+}));
+$("sectors").addEventListener("change", e => later(() => {
+  const firms = SECTORS[e.target.value] || [];
+  $("entity").innerHTML = "<option>Select Company</option>" + firms.map(f => "<option>" + f + "</option>").join("");
+}));
+$("entity").addEventListener("change", e => {
+  const query = new URLSearchParams({entity: e.target.value, start: $("startTimePeriod").value,
+                                     end: $("endTimePeriod").value});
+  fetch("/api/history?" + query).then(r => r.json()).then(data => later(() => {
+    rows = data; page = 0; render();
+  }));
+});
+$("pageing_next").addEventListener("click", e => {
+  e.preventDefault();
+  if (!e.target.className.includes("disabled")) later(() => { page += 1; render(); });
+});
+</script>
+</body></html>
+"""
+
+
+def trading_days(first=FIRST_DAY, last=LAST_DAY):
+    """Sunday-Thursday, the Saudi Exchange trading week."""
+    day = first
+    while day <= last:
+        if day.weekday() not in (4, 5):  # Friday, Saturday
+            yield day
+        day += datetime.timedelta(days=1)
+
+
+def history(entity, start=None, end=None):
+    """Table rows of ``entity`` between two dates, newest first, as page text."""
+    rng = random.Random(zlib.crc32(entity.encode()))
+    close = rng.uniform(10, 200)
+    rows = []
+    for day in trading_days():
+        previous = close
+        close = max(0.5, close * (1 + rng.gauss(0, 0.02)))
+        open_ = previous * (1 + rng.gauss(0, 0.005))
+        high = max(open_, close) * (1 + abs(rng.gauss(0, 0.005)))
+        low = min(open_, close) * (1 - abs(rng.gauss(0, 0.005)))
+        volume = int(rng.lognormvariate(13, 1))
+        if (start is None or day >= start) and (end is None or day <= end):
+            change = close - previous
+            rows.append([
+                day.isoformat(), f"{open_:,.2f}", f"{high:,.2f}", f"{low:,.2f}", f"{close:,.2f}",
+                f"{change:,.2f}", f"{change / previous * 100:,.2f}",
+                f"{volume:,}" if rng.random() > 0.01 else "-", "", "",
+            ])
+    return rows[::-1]
+
+
+def _input_date(value):
+    return datetime.datetime.strptime(value, "%d-%m-%Y").date() if value else None
+
+
+def make_handler(delay):
+    page = (PAGE.replace("__DELAY__", str(int(delay * 1000)))
+            .replace("__SECTORS__", json.dumps(FIXTURE_SECTORS))
+            .replace("__PAGE_SIZE__", str(PAGE_SIZE)))
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body, content_type):
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/api/history":
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                rows = history(query.get("entity", ""), _input_date(query.get("start")),
+                               _input_date(query.get("end")))
+                self._send(json.dumps(rows), "application/json")
+            elif url.path in ("/", "/historical-reports"):
+                self._send(page, "text/html; charset=utf-8")
+            else:
+                self.send_error(404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, delay=0.2):
+    """Serve the fixture from a background thread; returns (server, url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an offline copy of the historical reports page.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds before the page reacts to a selection")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.delay))
+    print(f"✅ Fixture serving on http://127.0.0.1:{args.port}/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
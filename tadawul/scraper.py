@@ -0,0 +1,306 @@
+"""Parallel, resumable scraper for the Saudi Exchange historical reports page.
+
+Sectors are split across a pool of browser workers, each driving its own
+WebDriver. Page changes are awaited explicitly (the old table rows going
+stale, the new ones appearing) instead of with fixed sleeps.
+
+Scraped rows are typed and appended straight to the Parquet price store
+(tadawul/ingest.py), one partition per firm, unique on (Firm, Date). A
+manifest in the store records every finished firm, so a crashed run picks
+up where it stopped. In incremental mode each firm is only fetched from
+the day after its last stored date.
+
+Selenium is imported only when a browser is started, so the rest of the
+package (and the offline fixture in tadawul/scrape_fixture.py) does not
+need it.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tadawul import ingest
+
+URL = "https://www.saudiexchange.sa/wps/portal/saudiexchange/newsandreports/reports-publications/historical-reports?locale=en"
+STORE_DIR = ingest.STORE_DIR
+MANIFEST_NAME = ".scrape_manifest.json"
+START_DATE = "2020-01-01"
+END_DATE = "2025-05-31"
+MARKET = "Main Market"
+TIMEOUT = 20
+RETRIES = 2
+
+# Read every cell of the current table page in one round trip
+ROWS_SCRIPT = """
+return Array.from(document.querySelectorAll('table tbody tr')).map(
+    row => Array.from(row.querySelectorAll('td')).map(td => td.textContent.trim()));
+"""
+SET_DATES_SCRIPT = """
+for (const [id, value] of [['startTimePeriod', arguments[0]], ['endTimePeriod', arguments[1]]]) {
+    const input = document.getElementById(id);
+    input.value = value;
+    input.dispatchEvent(new Event('change'));
+}
+"""
+
+
+def make_driver(browser="edge", headless=False):
+    from selenium import webdriver
+
+    if browser == "edge":
+        options = webdriver.EdgeOptions()
+    elif browser == "chrome":
+        options = webdriver.ChromeOptions()
+    elif browser == "firefox":
+        options = webdriver.FirefoxOptions()
+    else:
+        raise ValueError(f"Unsupported browser: {browser}")
+    if headless:
+        options.add_argument("--headless")
+    return {"edge": webdriver.Edge, "chrome": webdriver.Chrome, "firefox": webdriver.Firefox}[browser](options=options)
+
+
+def file_stem(sector, entity):
+    return f"{sector.strip().replace(' ', '_')}_{entity.strip().replace(' ', '_')}"
+
+
+class HistoricalReportsPage:
+    """The historical reports page, driven with explicit waits."""
+
+    def __init__(self, driver, url=URL, timeout=TIMEOUT):
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        self.driver = driver
+        self.url = url
+        self.wait = WebDriverWait(driver, timeout)
+
+    def _select(self, element_id):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import Select
+
+        return Select(self.wait.until(EC.presence_of_element_located((By.ID, element_id))))
+
+    def _first(self, xpath):
+        from selenium.webdriver.common.by import By
+
+        found = self.driver.find_elements(By.XPATH, xpath)
+        return found[0] if found else None
+
+    def _await_replaced(self, old, xpath):
+        """Wait until ``old`` was re-rendered and new elements matching ``xpath`` exist."""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+
+        if old is not None:
+            self.wait.until(EC.staleness_of(old))
+        self.wait.until(EC.presence_of_element_located((By.XPATH, xpath)))
+
+    def open(self):
+        self.driver.get(self.url)
+        self._select("marketOrIndices").select_by_visible_text(MARKET)
+        self.wait.until(lambda d: len(self._select("sectors").options) > 1)
+
+    def set_dates(self, start, end):
+        """Set the report period; dates are YYYY-MM-DD strings."""
+        to_input = lambda day: datetime.date.fromisoformat(day).strftime("%d-%m-%Y")
+        self.driver.execute_script(SET_DATES_SCRIPT, to_input(start), to_input(end))
+
+    def sectors(self):
+        return [option.text.strip() for option in self._select("sectors").options[1:]]
+
+    def select_sector(self, sector):
+        old = self._first("//select[@id='entity']/option")
+        self._select("sectors").select_by_visible_text(sector)
+        self._await_replaced(old, "//select[@id='entity']/option")
+
+    def entities(self):
+        return [option.text.strip() for option in self._select("entity").options[1:]]
+
+    def select_entity(self, entity):
+        old = self._first("//table//tbody//tr")
+        self._select("entity").select_by_visible_text(entity)
+        self._await_replaced(old, "//table//tbody//tr")
+
+    def rows(self):
+        """Cells of every row on every page of the loaded table."""
+        from selenium.webdriver.common.by import By
+
+        all_rows = []
+        while True:
+            all_rows += [cells for cells in self.driver.execute_script(ROWS_SCRIPT) if cells]
+            next_button = self.driver.find_elements(By.ID, "pageing_next")
+            if not next_button or "disabled" in (next_button[0].get_attribute("class") or ""):
+                return all_rows
+            old = self._first("//table//tbody//tr")
+            next_button[0].click()
+            self._await_replaced(old, "//table//tbody//tr")
+
+
+class Manifest:
+    """Per-firm scrape status, saved after every firm so a crash loses nothing."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.firms = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.firms = json.load(f).get("firms", {})
+
+    def get(self, stem):
+        with self.lock:
+            return dict(self.firms.get(stem, {}))
+
+    def record(self, stem, **entry):
+        with self.lock:
+            self.firms[stem] = {**entry, "updated": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"firms": self.firms}, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+def partition(listing, workers):
+    """Split {sector: [entities]} into ``workers`` groups of similar firm counts."""
+    groups = [{} for _ in range(max(1, min(workers, len(listing))))]
+    loads = [0] * len(groups)
+    for sector in sorted(listing, key=lambda s: len(listing[s]), reverse=True):
+        least = loads.index(min(loads))
+        groups[least][sector] = listing[sector]
+        loads[least] += len(listing[sector])
+    return [group for group in groups if group]
+
+
+def fetch_range(manifest, store_dir, stem, start, end, incremental):
+    """(start, end) still to fetch for a firm, or None if it is up to date."""
+    entry = manifest.get(stem)
+    if incremental:
+        last = entry.get("last_date") or ingest.last_date(stem, store_dir)
+        if last is not None:
+            start = max(start, (datetime.date.fromisoformat(last) + datetime.timedelta(days=1)).isoformat())
+        return (start, end) if start <= end else None
+    # A full run skips firms an earlier (possibly interrupted) run already covered
+    covered = entry.get("status") == "done" and entry.get("start", "9999") <= start and entry.get("end", "") >= end
+    return None if covered else (start, end)
+
+
+def is_data_row(cells):
+    # The empty table shows one "No data available in table" cell
+    return len(cells) > 1
+
+
+def _scrape_group(group, manifest, store_dir, start, end, incremental, url, browser, headless):
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+
+    driver = make_driver(browser, headless)
+    done = failed = skipped = 0
+    try:
+        page = HistoricalReportsPage(driver, url)
+        # The page is (re)loaded and the sector selected inside a firm's attempts,
+        # so a page that stays broken fails that firm's attempts, not the group
+        fresh, selected = False, None
+        for sector, entities in group.items():
+            for entity in entities:
+                stem = file_stem(sector, entity)
+                window = fetch_range(manifest, store_dir, stem, start, end, incremental)
+                if window is None:
+                    skipped += 1
+                    continue
+                for attempt in range(RETRIES + 1):
+                    try:
+                        if not fresh:
+                            page.open()
+                            fresh, selected = True, None
+                        if selected != sector:
+                            page.select_sector(sector)
+                            selected = sector
+                        page.set_dates(*window)
+                        page.select_entity(entity)
+                        rows = [cells for cells in page.rows() if is_data_row(cells)]
+                        break
+                    except (TimeoutException, WebDriverException) as error:
+                        # Start over from a fresh page before the next attempt
+                        fresh = False
+                        if attempt == RETRIES:
+                            manifest.record(stem, status="failed", sector=sector, entity=entity,
+                                            start=window[0], end=window[1], error=str(error).strip()[:500])
+                            print(f"❌ Failed: {sector} / {entity}: {type(error).__name__}")
+                            failed += 1
+                            rows = None
+                if rows is None:
+                    continue
+                try:
+                    if rows:
+                        total = ingest.append_rows(stem, rows, store_dir)
+                        print(f"✅ Stored: {sector} / {entity} (+{len(rows)} rows, {total} total)")
+                    previous = manifest.get(stem)
+                    last = max([cells[0] for cells in rows] + [previous.get("last_date") or ""]) or None
+                    manifest.record(stem, status="done", sector=sector, entity=entity,
+                                    start=min(window[0], previous.get("start", window[0])), end=window[1],
+                                    rows=len(rows), last_date=last)
+                except Exception as error:
+                    # E.g. a sector missing from SECTORS or a cell that cannot be typed;
+                    # keep going with the group's other firms and retry this one on resume
+                    manifest.record(stem, status="failed", sector=sector, entity=entity,
+                                    start=window[0], end=window[1], error=f"{type(error).__name__}: {error}"[:500])
+                    print(f"❌ Failed: {sector} / {entity}: {type(error).__name__}: {error}")
+                    failed += 1
+                    continue
+                done += 1
+    finally:
+        driver.quit()
+    return {"done": done, "failed": failed, "skipped": skipped}
+
+
+def scrape(store_dir=STORE_DIR, start=START_DATE, end=END_DATE, workers=4, incremental=False,
+           url=URL, browser="edge", headless=False, sectors=None, source_dir=ingest.SOURCE_DIR):
+    """Scrape every (or the given) sector; returns counts of done/failed/skipped firms.
+
+    A firm that fails is recorded as failed in the manifest and retried by
+    the next run. ``failed_groups`` counts workers that stopped (e.g. their
+    browser would not start), whose firms are all counted as failed; only if
+    every worker did is the error raised.
+    """
+    # Rows from earlier CSV captures go into the store first, so new rows extend them
+    if os.path.isdir(source_dir):
+        ingest.ingest(source_dir, store_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(store_dir, MANIFEST_NAME))
+
+    # One browser lists the firms of each sector so the work can be balanced
+    driver = make_driver(browser, headless)
+    try:
+        page = HistoricalReportsPage(driver, url)
+        page.open()
+        listing = {}
+        for sector in page.sectors():
+            if sectors is None or sector in sectors:
+                page.select_sector(sector)
+                listing[sector] = page.entities()
+    finally:
+        driver.quit()
+
+    groups = partition(listing, workers)
+    with ThreadPoolExecutor(max_workers=len(groups) or 1) as pool:
+        futures = [
+            pool.submit(_scrape_group, group, manifest, store_dir, start, end, incremental, url, browser, headless)
+            for group in groups
+        ]
+    # Wait for every group, so one group's error does not hide the others' results
+    results, errors = [], []
+    for group, future in zip(groups, futures):
+        try:
+            results.append(future.result())
+        except Exception as error:
+            print(f"❌ Group failed ({', '.join(group)}): {type(error).__name__}: {error}")
+            errors.append(error)
+            # Its firms keep their manifest entries and are fetched again by the next run
+            results.append({"done": 0, "failed": sum(len(entities) for entities in group.values()), "skipped": 0})
+    if errors and len(errors) == len(groups):
+        raise errors[0]
+    counts = {key: sum(result[key] for result in results) for key in ("done", "failed", "skipped")}
+    counts["failed_groups"] = len(errors)
+    return counts
@@ -0,0 +1,45 @@
+"""Tadawul sector names and their Super Sector grouping.
+
+The scraper saves one file per firm as ``<Sector>_<Firm>.csv`` with spaces
+replaced by underscores, so the sector has to be recovered by matching the
+known sector prefixes rather than by splitting on ``_``.
+"""
+
+# Sector name as it appears in the scraped file name -> (Sector, Super Sector)
+SECTORS = {
+    "Banks": ("Banks", "Financial Services"),
+    "Capital_Goods": ("Capital Goods", "Financial Services"),
+    "Commercial_&_Professional_Svc": ("Commercial & Professional", "Industrial"),
+    "Consumer_Discretionary_Distribution_&_Retail": ("Consumer Discretionary Distribution & Retail", "Consumer Discretionary"),
+    "Consumer_Durables_&_Apparel": ("Consumer Durables & Apparel", "Consumer Discretionary"),
+    "Consumer_Services": ("Consumer Services", "Consumer Discretionary"),
+    "Consumer_Staples_Distribution_&_Retail": ("Consumer Staples Distribution & Retail", "Consumer Discretionary"),
+    "Energy": ("Energy", "Energy"),
+    "Financial_Services": ("Financial Services", "Financial Services"),
+    "Food_&_Beverages": ("Food & Beverages", "Consumer Staples"),
+    "Health_Care_Equipment_&_Svc": ("Health Care Equipment & Svc", "Healthcare"),
+    "Household_&_Personal_Products": ("Household & Personal Products", "Consumer Staples"),
+    "Insurance": ("Insurance", "Financial Services"),
+    "Materials": ("Materials", "Industrial"),
+    "Media_and_Entertainment": ("Media and Entertainment", "Communication Services"),
+    "Pharma,_Biotech_&_Life_Science": ("Pharma Biotech & Life Science", "Healthcare"),
+    "REITs": ("REITs", "Real Estate"),
+    "Real_Estate_Mgmt_&_Dev't": ("Real Estate Mgmt & Dev't", "Real Estate"),
+    "Software_&_Services": ("Software & Services", "Information Technology"),
+    "Telecommunication_Services": ("Telecommunication Services", "Communication Services"),
+    "Transportation": ("Transportation", "Industrial"),
+    "Utilities": ("Utilities", "Utilities"),
+}
+
+# Longest prefix first so e.g. "Consumer_Services" never shadows a longer name
+_PREFIXES = sorted(SECTORS, key=len, reverse=True)
+
+
+def split_file_stem(stem):
+    """Return (Sector, Super Sector, Firm) for a scraped file name stem."""
+    for prefix in _PREFIXES:
+        if stem.startswith(prefix + "_"):
+            sector, super_sector = SECTORS[prefix]
+            firm = stem[len(prefix) + 1:].replace("_", " ").strip()
+            return sector, super_sector, firm
+    raise ValueError(f"Unknown sector prefix in file name: {stem!r}")
@@ -0,0 +1,157 @@
+"""Immutable, versioned snapshots of the price history for the dashboard.
+
+The pipeline publishes the typed price table as an uncompressed Arrow IPC
+file inside a new version directory, then points ``CURRENT`` at it with an
+atomic rename. Readers memory-map the file read-only: every dashboard
+process on the host shares one page-cache copy, numeric columns are used
+in place without parsing, and a reader only ever sees a complete snapshot
+because a version directory is never modified after it is published.
+
+Coarser resolutions of the same history (weekly and monthly bars, see
+tadawul/resample.py) are published in the same version directory, so they
+always match the daily table they were built from. So are copies of the
+other files the dashboard reads (summaries, rollups, risk series,
+correlation states), under their usual relative paths: the whole set
+switches to the new version with the single pointer rename.
+
+    outputs/snapshots/
+        CURRENT                      -> "20261018T104800-3f9c2a1b"
+        20261018T104800-3f9c2a1b/prices.arrow
+        20261018T104800-3f9c2a1b/prices_weekly.arrow
+        20261018T104800-3f9c2a1b/prices_monthly.arrow
+        20261018T104800-3f9c2a1b/files/output/rollup_sector.csv
+        ...
+"""
+import hashlib
+import os
+import shutil
+import time
+
+import pyarrow as pa
+import pyarrow.ipc
+
+SNAPSHOT_DIR = "outputs/snapshots"
+POINTER = "CURRENT"
+TABLE_FILE = "prices.arrow"
+KEEP_VERSIONS = 3
+FILES_DIR = "files"
+
+
+def current_version(snapshot_dir=SNAPSHOT_DIR):
+    """Name of the published snapshot, or None if nothing was published yet."""
+    try:
+        with open(os.path.join(snapshot_dir, POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_pointer(snapshot_dir, version):
+    tmp = os.path.join(snapshot_dir, POINTER + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(snapshot_dir, POINTER))
+
+
+def table_file(resolution=None):
+    return TABLE_FILE if resolution is None else f"prices_{resolution}.arrow"
+
+
+def _write_table(df, path, digest):
+    # One contiguous chunk per column, so readers can map every column in place
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    with open(path, "r+b") as f:
+        digest.update(f.read())
+        os.fsync(f.fileno())
+
+
+def _copy_file(path, target, digest):
+    # A copy, not a hard link: the pipeline rewrites its outputs in place
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copy2(path, target)
+    with open(target, "r+b") as f:
+        digest.update(path.encode())
+        digest.update(f.read())
+        os.fsync(f.fileno())
+
+
+def publish(df, snapshot_dir=SNAPSHOT_DIR, keep=KEEP_VERSIONS, resolutions=None, files=()):
+    """Write ``df`` as a new snapshot, make it current and return its version.
+
+    ``resolutions`` maps a resolution name ("weekly", "monthly") to the
+    bars published next to ``df``; ``files`` are relative paths copied in
+    with it (see :func:`file_path`).
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    staging = os.path.join(snapshot_dir, f".staging-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    digest = hashlib.sha1()
+    _write_table(df, os.path.join(staging, TABLE_FILE), digest)
+    for resolution, bars in sorted((resolutions or {}).items()):
+        _write_table(bars, os.path.join(staging, table_file(resolution)), digest)
+    for path in sorted(files):
+        _copy_file(path, os.path.join(staging, FILES_DIR, os.path.normpath(path)), digest)
+
+    current = current_version(snapshot_dir)
+    if current is not None and current.endswith("-" + digest.hexdigest()[:8]):
+        # Same data as the published snapshot: keep it, and the readers' caches
+        shutil.rmtree(staging)
+        return current
+
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{digest.hexdigest()[:8]}"
+    final = os.path.join(snapshot_dir, version)
+    if os.path.exists(final):
+        shutil.rmtree(staging)
+    else:
+        os.rename(staging, final)
+    _write_pointer(snapshot_dir, version)
+    prune(snapshot_dir, keep)
+    return version
+
+
+def prune(snapshot_dir=SNAPSHOT_DIR, keep=KEEP_VERSIONS):
+    """Delete all but the ``keep`` newest versions (never the current one).
+
+    Processes that still have an old snapshot mapped keep reading it: the
+    file's pages stay valid until they unmap it.
+    """
+    current = current_version(snapshot_dir)
+    versions = sorted(
+        name for name in os.listdir(snapshot_dir)
+        if not name.startswith(".") and os.path.isdir(os.path.join(snapshot_dir, name))
+    )
+    for name in versions[:-keep] if keep else versions:
+        if name != current:
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+
+
+def file_path(version, path, snapshot_dir=SNAPSHOT_DIR):
+    """Where the snapshot keeps its copy of ``path``, or None if it has none."""
+    published = os.path.join(snapshot_dir, version, FILES_DIR, os.path.normpath(path))
+    return published if os.path.exists(published) else None
+
+
+def open_table(version, snapshot_dir=SNAPSHOT_DIR, columns=None, resolution=None):
+    """The snapshot's Arrow table, backed by a read-only memory map.
+
+    ``resolution`` opens the weekly or monthly bars instead of the daily
+    rows; snapshots published without them raise FileNotFoundError.
+    """
+    source = pa.memory_map(os.path.join(snapshot_dir, version, table_file(resolution)), "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table if columns is None else table.select([col for col in columns if col in table.column_names])
+
+
+def load(version, snapshot_dir=SNAPSHOT_DIR, columns=None, resolution=None):
+    """The snapshot (or one of its resolutions) as a DataFrame.
+
+    Numeric and date columns without missing values are views of the
+    mapped file rather than copies, so they are read-only.
+    """
+    return open_table(version, snapshot_dir, columns, resolution).to_pandas(split_blocks=True)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the pipeline and tadawul the way the repository-root scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,36 @@
+import importlib
+import os
+
+import pipeline
+from tadawul.dag import Pipeline, Stage, code_files
+
+
+def test_stage_goes_stale_when_called_module_changes(tmp_path, monkeypatch):
+    (tmp_path / "helpers.py").write_text("def scale(x):\n    return x * 2\n")
+    (tmp_path / "worker.py").write_text("import helpers\n\n\ndef work():\n    return helpers.scale(21)\n")
+    (tmp_path / "wrapper.py").write_text("import worker\n\n\ndef run():\n    return worker.work()\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    wrapper, worker = importlib.import_module("wrapper"), importlib.import_module("worker")
+
+    dag = Pipeline([Stage("work", wrapper.run, code=[worker])], str(tmp_path / "state.json"))
+    assert dag.run(workers=1)[0]["status"] == "ran"
+    assert dag.plan()[0] == set()
+
+    # The wrapper's file is unchanged; the module doing the work (and what it imports) is not
+    with open(tmp_path / "helpers.py", "a") as f:
+        f.write("# changed\n")
+    assert dag.plan()[0] == {"work"}
+
+
+def test_pipeline_stages_cover_the_modules_doing_their_work():
+    stages = pipeline.build_pipeline().stages
+
+    def covered(name):
+        return {os.path.relpath(path, os.path.dirname(pipeline.__file__)) for path in code_files(stages[name].code)}
+
+    assert {"tadawul/ingest.py", "tadawul/sectors.py"} <= covered("ingest")
+    assert {"scripts/cleand_data_analysed.py", "tadawul/risk.py", "tadawul/risk_store.py",
+            "tadawul/resample.py"} <= covered("analyse")
+    assert {"correlation_analysis.py", "tadawul/correlation.py"} <= covered("correlations")
+    assert {"scripts/analysis_tab1_performance.py", "tadawul/schema.py"} <= covered("tab1")
+    assert {"tadawul/resample.py", "tadawul/snapshot.py"} <= covered("snapshot")
@@ -0,0 +1,100 @@
+"""Scraper runs against the offline fixture page (tadawul/scrape_fixture.py).
+
+Skipped without Selenium; the end-to-end run also needs a headless browser
+(TADAWUL_TEST_BROWSER, default chrome).
+"""
+import os
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from tadawul import ingest, scrape_fixture, scraper
+
+BROWSER = os.environ.get("TADAWUL_TEST_BROWSER", "chrome")
+FIXTURE_FIRMS = sum(len(firms) for firms in scrape_fixture.FIXTURE_SECTORS.values())
+
+
+@pytest.fixture
+def fixture_url():
+    try:
+        scraper.make_driver(BROWSER, headless=True).quit()
+    except Exception as error:
+        pytest.skip(f"no headless {BROWSER}: {error}")
+    server, url = scrape_fixture.start_server(delay=0.05)
+    yield url
+    server.shutdown()
+
+
+def test_scrape_fixture_then_resume(tmp_path, fixture_url):
+    store = str(tmp_path / "store")
+    options = dict(store_dir=store, url=fixture_url, browser=BROWSER, headless=True,
+                   source_dir=str(tmp_path / "no_csvs"), workers=2)
+
+    counts = scraper.scrape(start="2025-04-01", end="2025-05-29", **options)
+    assert counts == {"done": FIXTURE_FIRMS, "failed": 0, "skipped": 0, "failed_groups": 0}
+
+    # Every page of the table was read (the fixture shows 10 rows per page)
+    expected = scrape_fixture.history("Al Rajhi Bank", *map(scrape_fixture.datetime.date.fromisoformat,
+                                                            ("2025-04-01", "2025-05-29")))
+    prices = ingest.load_price_store(store)
+    stored = prices[prices["Firm"] == "Al Rajhi Bank"]
+    assert len(stored) == len(expected) > scrape_fixture.PAGE_SIZE
+    assert ingest.last_date("Banks_Al_Rajhi_Bank", store) == "2025-05-29"
+
+    manifest = scraper.Manifest(os.path.join(store, scraper.MANIFEST_NAME))
+    assert {entry["status"] for entry in manifest.firms.values()} == {"done"}
+
+    # Nothing new to fetch: a resumed incremental run skips every firm
+    counts = scraper.scrape(start="2025-04-01", end="2025-05-29", incremental=True, **options)
+    assert counts["skipped"] == FIXTURE_FIRMS and counts["done"] == 0
+
+
+class _BrokenPage:
+    """Fails to load ``broken`` times, then behaves like the fixture page."""
+
+    def __init__(self, broken):
+        self.broken = broken
+        self.opened = 0
+
+    def open(self):
+        from selenium.common.exceptions import TimeoutException
+
+        self.opened += 1
+        if self.opened <= self.broken:
+            raise TimeoutException("page did not load")
+
+    def select_sector(self, sector):
+        pass
+
+    def set_dates(self, start, end):
+        self.window = (start, end)
+
+    def select_entity(self, entity):
+        self.entity = entity
+
+    def rows(self):
+        start, end = map(scrape_fixture.datetime.date.fromisoformat, self.window)
+        return scrape_fixture.history(self.entity, start, end)
+
+
+class _Driver:
+    def quit(self):
+        pass
+
+
+def test_failed_recovery_fails_the_firm_not_the_group(tmp_path, monkeypatch):
+    # The first firm uses up all its attempts on a page that will not load
+    page = _BrokenPage(broken=scraper.RETRIES + 1)
+    monkeypatch.setattr(scraper, "make_driver", lambda browser, headless: _Driver())
+    monkeypatch.setattr(scraper, "HistoricalReportsPage", lambda driver, url: page)
+    store = str(tmp_path / "store")
+    manifest = scraper.Manifest(os.path.join(store, scraper.MANIFEST_NAME))
+    os.makedirs(store)
+    group = {"Banks": scrape_fixture.FIXTURE_SECTORS["Banks"]}
+
+    counts = scraper._scrape_group(group, manifest, store, "2025-05-01", "2025-05-29", False,
+                                   "fixture", BROWSER, True)
+    assert counts == {"done": len(group["Banks"]) - 1, "failed": 1, "skipped": 0}
+    statuses = {stem: entry["status"] for stem, entry in manifest.firms.items()}
+    assert statuses == {"Banks_Al_Rajhi_Bank": "failed", "Banks_Alinma_Bank": "done", "Banks_Bank_Albilad": "done"}